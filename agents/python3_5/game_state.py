@@ -8,16 +8,14 @@ import websockets
 from websockets.client import WebSocketClientProtocol
 
 
-SIZE = 15
-SIZE2 = SIZE * SIZE
 UNREACHABLE = 10000000
 
 
 class Cell:
     def __init__(self, board, position):
         self.board = board
-        self.x = position % SIZE
-        self.y = position // SIZE
+        self.x = position % board.width
+        self.y = position // board.width
         self.west, self.north, self.east, self.south = None, None, None, None
         self.dists = {} # {unit_id: (dist, prev_cell)}
         self.target_range = [0] * 10 # number of targets within range 1, 2, 3, 4...
@@ -54,7 +52,7 @@ class Cell:
 
     def neighbor(self, dx, dy):
         x, y = self.x + dx, self.y + dy
-        if 0 <= x < SIZE and 0 <= y < SIZE:
+        if 0 <= x < self.board.width and 0 <= y < self.board.height:
             return self.board.cell(x, y)
         return None
 
@@ -73,17 +71,22 @@ class Cell:
                 and not (cell.unit and cell.unit.hp <= 0)] # No dead unit
 
     def get_dist(self, other_cell, player):
+        '''A* search, the box_dists to other_cell never overestimate what is left'''
         opp_id = 'a' if player.id == 'b' else 'b'
         temp_id = 'temp'
+        box_dists = self.board.box_dists(other_cell)
+        if box_dists[self.y * self.board.width + self.x] == UNREACHABLE:
+            return UNREACHABLE
         for cell in self.board.cells:
             cell.dists[temp_id] = (UNREACHABLE, None)
 
         self.dists[temp_id] = (0, None)
-        queue = [(0, 0, self)]
+        queue = [(box_dists[self.y * self.board.width + self.x], 0, self)]
         while queue:
-            dist, _, cell = heapq.heappop(queue)
+            estimate, _, cell = heapq.heappop(queue)
             if cell is other_cell:
-                return dist
+                return estimate
+            dist = estimate - box_dists[cell.y * self.board.width + cell.x]
             for new_cell in cell.search_neighbors(player):
                 new_dist = dist + 1
                 if new_cell.box:
@@ -96,7 +99,7 @@ class Cell:
 
                 if new_dist < new_cell.dists[temp_id][0]:
                     new_cell.dists[temp_id] = (new_dist, cell)
-                    heapq.heappush(queue, (new_dist, random.random(), new_cell))
+                    heapq.heappush(queue, (new_dist + box_dists[new_cell.y * self.board.width + new_cell.x], random.random(), new_cell))
         return UNREACHABLE
 
     def _update_dists_to_all(self, unit_id, player):
@@ -124,9 +127,9 @@ class Cell:
                     new_cell.dists[unit_id] = (new_dist, cell)
                     heapq.heappush(queue, (new_dist, random.random(), new_cell))
         #print(f'Dists for unit {self.id} at {self.x},{self.y}')
-        #for y in range(SIZE - 1, -1, -1):
+        #for y in range(self.board.height - 1, -1, -1):
         #    s = ''
-        #    for cell in self.board.cells[(y * SIZE):(y * SIZE + SIZE)]:
+        #    for cell in self.board.cells[(y * self.board.width):(y * self.board.width + self.board.width)]:
         #        if cell.dists[self.id][0] == UNREACHABLE:
         #            s += '--\t'
         #        else:
@@ -256,7 +259,7 @@ class Unit:
         if self.cell and self.cell.unit == self:
             self.cell.unit = None
         self.x, self.y = payload['coordinates']
-        self.cell = self.board.cells[self.y * SIZE + self.x]
+        self.cell = self.board.cell(self.x, self.y)
         self.cell.unit = self
         self.player = self.board.player_a if payload['agent_id'] == 'a' else self.board.player_b
         self.hp = payload['hp']
@@ -275,7 +278,7 @@ class Unit:
             self.x += 1
         elif move_action == "left":
             self.x -= 1
-        self.cell = self.board.cells[self.y * SIZE + self.x]
+        self.cell = self.board.cell(self.x, self.y)
         self.cell.unit = self
 
 
@@ -289,8 +292,11 @@ class Player:
 class Board:
     def __init__(self, game_state):
         self.tick = 0
+        self.width = game_state['world']['width']
+        self.height = game_state['world']['height']
+        self._box_dists = {} # cell: box_dists field
 
-        self.cells = [Cell(self, i) for i in range(SIZE2)]
+        self.cells = [Cell(self, i) for i in range(self.width * self.height)]
         self.player_a = Player('a')
         self.player_b = Player('b')
 
@@ -312,7 +318,40 @@ class Board:
         self.opp = self.player_a if agent_id == 'b' else self.player_b
 
     def cell(self, x, y):
-        return self.cells[y * SIZE + x]
+        return self.cells[y * self.width + x]
+
+    def box_dists(self, cell):
+        '''[y * width + x]: cheapest get_dist cost from each cell to cell, counting walls and boxes
+        but not units or future fire, so it never overestimates get_dist. Kept for every goal
+        cell asked about and repaired as boxes and walls go away.'''
+        dists = self._box_dists.get(cell)
+        if dists is None:
+            dists = self._box_dists[cell] = [UNREACHABLE] * len(self.cells)
+            dists[cell.y * self.width + cell.x] = 0
+            self._relax_box_dists(dists, [(0, cell.y * self.width + cell.x)])
+        return dists
+
+    def _relax_box_dists(self, dists, queue):
+        '''Dijkstra backwards from the (dist, pos) items in queue, only ever lowering dists'''
+        while queue:
+            dist, pos = heapq.heappop(queue)
+            cell = self.cells[pos]
+            if dist > dists[pos] or cell.wall: # Walls can be left but not entered
+                continue
+            new_dist = dist + 1 # Cost of entering cell
+            if cell.box:
+                new_dist += 14 * cell.hp
+            for new_cell in (cell.north, cell.east, cell.south, cell.west):
+                if new_cell and new_dist < dists[new_cell.y * self.width + new_cell.x]:
+                    dists[new_cell.y * self.width + new_cell.x] = new_dist
+                    heapq.heappush(queue, (new_dist, new_cell.y * self.width + new_cell.x))
+
+    def _repair_box_dists(self, cell):
+        '''cell got cheaper to enter (box damaged or gone, wall gone)'''
+        pos = cell.y * self.width + cell.x
+        for dists in self._box_dists.values():
+            if dists[pos] != UNREACHABLE:
+                self._relax_box_dists(dists, [(dists[pos], pos)])
 
     def get_bomb_area(self, cell, diameter=None):
         bomb_cells = set()
@@ -408,10 +447,28 @@ class Board:
 
     def _on_entity_spawned(self, payload):
         x, y = payload['x'], payload['y']
-        self.cells[y * SIZE + x]._on_entity_spawned(payload)
+        cell = self.cell(x, y)
+        cell._on_entity_spawned(payload)
+        if cell.wall or cell.box: # New obstacle, box_dists can only go up so start over
+            self._box_dists.clear()
 
     def _on_entity_expired(self, x, y):
-        self.cells[y * SIZE + x]._on_entity_expired()
+        cell = self.cell(x, y)
+        was_obstacle = cell.wall or cell.box
+        cell._on_entity_expired()
+        if was_obstacle:
+            self._repair_box_dists(cell)
+
+    def _on_entity_state(self, x, y, payload):
+        '''Entity replaced in place, e.g. a box losing hp'''
+        cell = self.cell(x, y)
+        old_hp = cell.hp if cell.box else 0
+        cell._on_entity_expired()
+        cell._on_entity_spawned(payload)
+        if cell.wall or (cell.box and cell.hp > old_hp):
+            self._box_dists.clear()
+        elif old_hp:
+            self._repair_box_dists(cell)
 
     def _on_unit_state(self, payload):
         unit_id = payload['unit_id']
@@ -497,8 +554,7 @@ class GameState:
             elif event_type == "entity_state":
                 x, y = event.get("coordinates")
                 updated_entity = event.get("updated_entity")
-                self.board._on_entity_expired(x, y)
-                self.board._on_entity_spawned(updated_entity)
+                self.board._on_entity_state(x, y, updated_entity)
             elif event_type == "unit":
                 unit_action = event.get("data")
                 self._on_unit_action(unit_action)
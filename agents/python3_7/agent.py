@@ -21,7 +21,7 @@ Maybe do full cell->cell distance calculation?
 
 '''
 
-from game_state import GameState, SIZE, UNREACHABLE
+from game_state import GameState, UNREACHABLE
 import asyncio
 import random
 import os
@@ -29,12 +29,15 @@ import time
 
 uri = os.environ.get(
     'GAME_CONNECTION_STRING') or "ws://127.0.0.1:3000/?role=agent&agentId=agentId&name=defaultName"
+backend = os.environ.get('BOARD_BACKEND') or 'python' # 'python' or 'numpy'
+safety_scores = os.environ.get('BOARD_SAFETY_SCORES') or 'python' # or 'numpy' (needs the numpy backend)
+seed = int(os.environ['BOARD_SEED']) if os.environ.get('BOARD_SEED') else None # Replay a logged 'Board seed'
 
 
 import gc
 class Agent():
     def __init__(self):
-        self._client = GameState(uri)
+        self._client = GameState(uri, backend=backend, seed=seed, safety_scores=safety_scores)
         self._client.set_game_tick_callback(self._on_game_tick)
         loop = asyncio.get_event_loop()
         connection = loop.run_until_complete(self._client.connect())
@@ -0,0 +1,112 @@
+'''
+Replay ../replay.json through GameState and time the tick handling.
+
+  python bench.py                      # python vs numpy board backend
+  python bench.py --agent --ticks 100  # include the agent's board copies in each tick
+  python bench.py --backend numpy --repeat 10
+  python bench.py --safety-scores numpy # numpy backend also diffuses safety scores with numpy
+
+Each backend is replayed --repeat times (interleaved, same board --seed) and the
+fastest run is reported, along with the time spent in Board._update_dists (unit
+searches and safety scores) and Board._update_target_range.
+'''
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import time
+
+from game_state import Board, GameState
+
+
+REPLAY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'replay.json')
+STAGES = ('_update_dists', '_update_target_range')
+
+
+class ReplayGameState(GameState):
+    '''GameState fed from a replay instead of a connection, actions are dropped'''
+    async def _send(self, packet):
+        pass
+
+
+def load_replay(path):
+    with open(path) as f:
+        payload = json.load(f)['payload']
+    initial_state = payload['initial_state']
+    initial_state.setdefault('connection', {'agent_id': 'a'})
+    return initial_state, payload['history']
+
+
+@contextlib.contextmanager
+def timed_stages(stage_times):
+    '''Adds the time spent in each of the STAGES Board methods to stage_times'''
+    originals = {name: getattr(Board, name) for name in STAGES}
+    def timed(name, method):
+        def wrapper(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                stage_times[name] += time.perf_counter() - start
+        return wrapper
+    for name, method in originals.items():
+        setattr(Board, name, timed(name, method))
+    try:
+        yield
+    finally:
+        for name, method in originals.items():
+            setattr(Board, name, method)
+
+
+async def replay(initial_state, history, with_agent, backend, seed, safety_scores):
+    client = ReplayGameState('', backend=backend, seed=seed, safety_scores=safety_scores)
+    if with_agent:
+        import agent
+        player = object.__new__(agent.Agent) # skip connecting
+        player._client = client
+        client.set_game_tick_callback(player._on_game_tick)
+
+    times = []
+    stage_times = dict.fromkeys(STAGES, 0)
+    with contextlib.redirect_stdout(io.StringIO()), timed_stages(stage_times):
+        client._on_game_state(json.loads(json.dumps(initial_state)))
+        for game_tick in history:
+            start = time.perf_counter()
+            await client._on_game_tick(game_tick)
+            times.append(time.perf_counter() - start)
+    return times, stage_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--replay', default=REPLAY)
+    parser.add_argument('--backend', nargs='+', default=['python', 'numpy'], choices=['python', 'numpy'])
+    parser.add_argument('--agent', action='store_true', help="run the agent's tick callback on every tick")
+    parser.add_argument('--safety-scores', default='python', choices=['python', 'numpy'],
+                        help='numpy needs the numpy backend')
+    parser.add_argument('--ticks', type=int, help='only replay the first TICKS ticks')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    initial_state, history = load_replay(args.replay)
+    history = history[:args.ticks]
+    best = {}
+    for _ in range(args.repeat):
+        for backend in args.backend:
+            times, stage_times = asyncio.run(replay(initial_state, history, args.agent, backend, args.seed, args.safety_scores))
+            if backend not in best or sum(times) < sum(best[backend][0]):
+                best[backend] = times, stage_times
+
+    print(f'{len(history)} ticks, agent={args.agent}, safety_scores={args.safety_scores}, best of {args.repeat}')
+    for backend, (times, stage_times) in best.items():
+        stages = '  '.join(f'{name} {1000 * stage_time:7.1f}ms' for name, stage_time in stage_times.items())
+        print(f'  backend={backend:<7} total {1000 * sum(times):7.1f}ms  '
+              f'mean {1000 * sum(times) / len(times):6.2f}ms  max {1000 * max(times):6.1f}ms  {stages}')
+
+
+if __name__ == '__main__':
+    main()
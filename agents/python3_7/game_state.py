@@ -1,5 +1,6 @@
 import asyncio
 import heapq
+import itertools
 import json
 import random
 import time
@@ -7,21 +8,48 @@ import websockets
 
 from websockets.client import WebSocketClientProtocol
 
+try:
+    import numpy as np
+except ImportError: # numpy backend is optional
+    np = None
+
 
-SIZE = 15
-SIZE2 = SIZE * SIZE
 UNREACHABLE = 10000000
 
 TARGET_RANGE_LEN = 5 # was 10
 
+PLAYER_IDS = ['a', 'b']
+UNIT_IDS = ['c', 'd', 'e', 'f', 'g', 'h']
+NUM_PLAYERS = len(PLAYER_IDS)
+NUM_UNITS = len(UNIT_IDS)
+OPPONENT = [1, 0] # player idx -> opponent player idx
+TEMP = NUM_UNITS # Scratch slot in Cell.safe_dists for one-off searches
+NO_FUTURE_FIRE = [None] * NUM_PLAYERS
+NEIGHBOR_ORDERS = list(itertools.permutations(range(4))) # Orders of [north, east, south, west], see Board.neighbor_order
+ZOBRIST_MASK = (1 << 64) - 1
+ZOBRIST_UNIT, ZOBRIST_WALL, ZOBRIST_BOX, ZOBRIST_BOMB, ZOBRIST_FIRE, ZOBRIST_BLAST_POWERUP, ZOBRIST_FREEZE_POWERUP = range(7)
+
+
+def zobrist_key(*values):
+    '''64-bit Zobrist key for a tuple of ints, splitmix64 of its hash so it is the same in every run'''
+    x = (hash(values) + 0x9E3779B97F4A7C15) & ZOBRIST_MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & ZOBRIST_MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & ZOBRIST_MASK
+    return x ^ (x >> 31)
+
 
 class Cell:
+    __slots__ = ('board', 'x', 'y', 'west', 'north', 'east', 'south', 'safe_dists', 'safe_paths',
+                 'target_range', 'unit', 'hp', 'wall', 'box', 'created', 'expires', 'bomb_diameter',
+                 'bomb_unit', 'fire', 'blast_powerup', 'freeze_powerup', 'future_fire_start',
+                 'future_fire_end', 'safety_scores')
+
     def __init__(self, board, position):
         self.board = board
-        self.x = position % SIZE
-        self.y = position // SIZE
+        self.x = position % board.width
+        self.y = position // board.width
         self.west, self.north, self.east, self.south = None, None, None, None
-        self.safe_dists = {} # {unit_id: (dist, prev_cell)}
+        self.safe_dists = [(UNREACHABLE, None)] * (NUM_UNITS + 1) # [unit_idx]: (dist, prev_cell)
         self.safe_paths = None
         self.target_range = [0] * TARGET_RANGE_LEN # number of targets within range 1, 2, 3, 4...
         self.unit = None
@@ -35,12 +63,12 @@ class Cell:
         self.fire = None # bool
         self.blast_powerup = None
         self.freeze_powerup = None
-        self.future_fire_start = {} # tick that fire may start
-        self.future_fire_end = {} # tick that fire may last until
-        self.safety_scores = {}
+        self.future_fire_start = list(NO_FUTURE_FIRE) # [player_idx]: tick that fire may start
+        self.future_fire_end = list(NO_FUTURE_FIRE) # [player_idx]: tick that fire may last until
+        self.safety_scores = [0] * NUM_PLAYERS
 
     def copy(self, new_board):
-        cell = Cell(new_board, self.y * SIZE + self.x)
+        cell = Cell(new_board, self.y * new_board.width + self.x)
         cell.hp = self.hp
         cell.wall = self.wall
         cell.box = self.box
@@ -56,6 +84,7 @@ class Cell:
         return cell
 
     def _on_entity_expired(self):
+        self.board.zobrist ^= self._entity_key()
         if self.bomb_unit:
             self.bomb_unit.bombs.remove(self)
             self.bomb_unit.player.bombs.remove(self)
@@ -69,17 +98,39 @@ class Cell:
         self.fire = None
         self.blast_powerup = None
         self.freeze_powerup = None
-        self.future_fire_start.clear()
-        self.future_fire_end.clear()
+        self.future_fire_start = list(NO_FUTURE_FIRE)
+        self.future_fire_end = list(NO_FUTURE_FIRE)
+
+    def has_future_fire(self):
+        return self.future_fire_start != NO_FUTURE_FIRE
+
+    def _entity_key(self):
+        '''Zobrist key of the cell's entities, see Board.hash'''
+        pos = self.y * self.board.width + self.x
+        key = 0
+        if self.wall:
+            key ^= zobrist_key(ZOBRIST_WALL, pos)
+        if self.box:
+            key ^= zobrist_key(ZOBRIST_BOX, pos, self.hp)
+        if self.bomb_diameter:
+            key ^= zobrist_key(ZOBRIST_BOMB, pos, self.bomb_unit.idx, self.bomb_diameter, self.expires)
+        if self.fire:
+            key ^= zobrist_key(ZOBRIST_FIRE, pos, self.expires)
+        if self.blast_powerup:
+            key ^= zobrist_key(ZOBRIST_BLAST_POWERUP, pos)
+        if self.freeze_powerup:
+            key ^= zobrist_key(ZOBRIST_FREEZE_POWERUP, pos)
+        return key
 
     def neighbor(self, dx, dy):
         x, y = self.x + dx, self.y + dy
-        if 0 <= x < SIZE and 0 <= y < SIZE:
+        if 0 <= x < self.board.width and 0 <= y < self.board.height:
             return self.board.cell(x, y)
         return None
 
     def search_neighbors(self, player):
-        cells = random.sample([self.north, self.east, self.south, self.west], 4)
+        neighbors = (self.north, self.east, self.south, self.west)
+        cells = [neighbors[i] for i in NEIGHBOR_ORDERS[self.board.neighbor_order[self.y * self.board.width + self.x]]]
         return [cell for cell in cells
                 if cell # cell exists
                 and not cell.wall # cell is not impenetrable
@@ -87,7 +138,8 @@ class Cell:
                 and not (cell.unit and (cell.unit.hp <= 0 or not cell.unit.player is player))] # No dead/opp unit
 
     def move_neighbors(self):
-        cells = random.sample([self.north, self.east, self.south, self.west], 4)
+        neighbors = (self.north, self.east, self.south, self.west)
+        cells = [neighbors[i] for i in NEIGHBOR_ORDERS[self.board.neighbor_order[self.y * self.board.width + self.x]]]
         return [cell for cell in cells
                 if cell # cell exists
                 and not cell.wall #and not cell.bomb_diameter and not cell.box  # No blocking entity
@@ -95,12 +147,12 @@ class Cell:
                 and not (cell.unit and self.board.tick + 1 <= cell.unit.stunned)] # No stunned unit
 
     def safe_turns(self, player, invulnerable):
-        own_id, opp_id = player.id, ('a' if player.id == 'b' else 'b')
+        own_idx, opp_idx = player.idx, OPPONENT[player.idx]
 
         danger_ranges = []
         if self.fire:
             danger_ranges.append((self.created, self.expires))
-        if self.future_fire_start:
+        if self.has_future_fire():
             # fire_start = 5
             #   tick = 2, arrive = 3 (Ok, can leave on 4 safely)
             #   tick = 3, arrive = 4 (Bad, can't leave in time)
@@ -109,10 +161,10 @@ class Cell:
             #   tick = 8, arrive = 9 (Bad)
             #   tick = 9, arrive = 10 (Ok)
             #   tick = 10, arrive = 11 (Ok)
-            if opp_id in self.future_fire_start:
-                danger_ranges.append((self.future_fire_start[opp_id], self.future_fire_end[opp_id]))
-            if own_id in self.future_fire_end:
-                danger_ranges.append((self.future_fire_end[own_id] - 5, self.future_fire_end[own_id]))
+            if self.future_fire_start[opp_idx] is not None:
+                danger_ranges.append((self.future_fire_start[opp_idx], self.future_fire_end[opp_idx]))
+            if self.future_fire_end[own_idx] is not None:
+                danger_ranges.append((self.future_fire_end[own_idx] - 5, self.future_fire_end[own_idx]))
 
         min_danger_start = UNREACHABLE
         for danger_start, safe_begin in danger_ranges:
@@ -125,7 +177,7 @@ class Cell:
 
     def is_safe(self, player, arrival_tick, invulnerable):
         '''Returns (bool, int) for is_safe, additional ticks necessary to wait'''
-        own_id, opp_id = player.id, ('a' if player.id == 'b' else 'b')
+        own_idx, opp_idx = player.idx, OPPONENT[player.idx]
 
         # If inaccessible
         if (self.wall
@@ -140,7 +192,7 @@ class Cell:
         danger_ranges = []
         if self.fire:
             danger_ranges.append((self.created, self.expires))
-        if self.future_fire_start:
+        if self.has_future_fire():
             # fire_start = 5
             #   tick = 2, arrive = 3 (Ok, can leave on 4 safely)
             #   tick = 3, arrive = 4 (Bad, can't leave in time)
@@ -149,10 +201,10 @@ class Cell:
             #   tick = 8, arrive = 9 (Bad)
             #   tick = 9, arrive = 10 (Ok)
             #   tick = 10, arrive = 11 (Ok)
-            if opp_id in self.future_fire_start:
-                danger_ranges.append((self.future_fire_start[opp_id], self.future_fire_end[opp_id]))
-            if own_id in self.future_fire_end:
-                danger_ranges.append((self.future_fire_end[own_id] - 5, self.future_fire_end[own_id]))
+            if self.future_fire_start[opp_idx] is not None:
+                danger_ranges.append((self.future_fire_start[opp_idx], self.future_fire_end[opp_idx]))
+            if self.future_fire_end[own_idx] is not None:
+                danger_ranges.append((self.future_fire_end[own_idx] - 5, self.future_fire_end[own_idx]))
 
         safe_wait = 0
         safe_wait_adjusted = True
@@ -182,13 +234,13 @@ class Cell:
 
     def get_safe_paths(self, player, invulnerable, ok_cells=None, bad_cells=None):
         '''Returns list of safe dest lists for 1-6tick (longer than invuln and bomb priming) cells'''
-        temp_id = 'temp'
         for cell in self.board.cells:
-            cell.safe_dists[temp_id] = (UNREACHABLE, None)
+            cell.safe_dists[TEMP] = (UNREACHABLE, None)
 
         safe_at_dist = [[] for _ in range(6+1)]
-        self.safe_dists[temp_id] = (0, None)
+        self.safe_dists[TEMP] = (0, None)
         queue = [(0, 0, self)]
+        push_order = itertools.count(1) # Ties pop in push order, the neighbor orders randomize them
         while queue:
             dist, _, cell = heapq.heappop(queue)
             if dist >= len(safe_at_dist):
@@ -209,7 +261,7 @@ class Cell:
                 # We know that prev_cell is ok at tick + dist - 1
                 #               and cell is ok at tick + dist + safe_wait
                 # Need to confirm tick + dist through tick + dist + safe_wait - 1
-                prev_cell = cell.safe_dists[temp_id][1]
+                prev_cell = cell.safe_dists[TEMP][1]
                 prev_safe, prev_safe_wait = prev_cell.is_safe(player, self.board.tick + dist + i, invulnerable)
                 if (not prev_safe and not prev_cell is self) or prev_safe_wait != 0:
                     wait_is_ok = False
@@ -221,9 +273,9 @@ class Cell:
 
             for new_cell in cell.search_neighbors(player):                          
                 new_dist = dist + safe_wait + 1
-                if new_dist < new_cell.safe_dists[temp_id][0]:
-                    new_cell.safe_dists[temp_id] = (new_dist, cell)
-                    heapq.heappush(queue, (new_dist, random.random(), new_cell))
+                if new_dist < new_cell.safe_dists[TEMP][0]:
+                    new_cell.safe_dists[TEMP] = (new_dist, cell)
+                    heapq.heappush(queue, (new_dist, next(push_order), new_cell))
 
         #safe_paths = safe_at_dist
         #print(f'unit {self.unit.id} safe paths:  ({self.unit.invulnerable} {self.unit.stunned})')
@@ -237,14 +289,13 @@ class Cell:
         return safe_at_dist
 
     def get_safe_dist(self, other_cell, player, invulnerable, stunned):
-        opp_id = 'a' if player.id == 'b' else 'b'
-        temp_id = 'temp'
         for cell in self.board.cells:
-            cell.safe_dists[temp_id] = (UNREACHABLE, None)
+            cell.safe_dists[TEMP] = (UNREACHABLE, None)
 
         init_dist = max(0, stunned - self.board.tick)
-        self.safe_dists[temp_id] = (0, None)
+        self.safe_dists[TEMP] = (0, None)
         queue = [(init_dist, 0, self)]
+        push_order = itertools.count(1)
         while queue:
             dist, _, cell = heapq.heappop(queue)
 
@@ -260,7 +311,7 @@ class Cell:
                 # We know that prev_cell is ok at tick + dist - 1
                 #               and cell is ok at tick + dist + safe_wait
                 # Need to confirm tick + dist through tick + dist + safe_wait - 1
-                prev_cell = cell.safe_dists[temp_id][1]
+                prev_cell = cell.safe_dists[TEMP][1]
                 prev_safe, prev_safe_wait = prev_cell.is_safe(player, self.board.tick + dist + i, invulnerable)
                 if (not prev_safe and not prev_cell is self) or prev_safe_wait != 0:
                     wait_is_ok = False
@@ -273,28 +324,28 @@ class Cell:
 
             for new_cell in cell.search_neighbors(player):
                 new_dist = dist + safe_wait + 1
-                if new_dist < new_cell.safe_dists[temp_id][0]:
-                    new_cell.safe_dists[temp_id] = (new_dist, cell)
-                    heapq.heappush(queue, (new_dist, random.random(), new_cell))
+                if new_dist < new_cell.safe_dists[TEMP][0]:
+                    new_cell.safe_dists[TEMP] = (new_dist, cell)
+                    heapq.heappush(queue, (new_dist, next(push_order), new_cell))
         return UNREACHABLE
 
-    def _update_safe_paths(self, unit_id, player):
-        assert self.unit and self.unit.id == unit_id
+    def _update_safe_paths(self, unit_idx, player):
+        assert self.unit and self.unit.idx == unit_idx
         self.safe_paths = self.get_safe_paths(player, self.unit.invulnerable)
 
-    def _update_safe_dists_to_all(self, unit_id, player):
-        assert self.unit and self.unit.id == unit_id
+    def _update_safe_dists_to_all(self, unit_idx, player):
+        assert self.unit and self.unit.idx == unit_idx
 
         for cell in self.board.cells:
-            cell.safe_dists[unit_id] = (UNREACHABLE, None)
+            cell.safe_dists[unit_idx] = (UNREACHABLE, None)
 
         if self.unit.hp <= 0:
             return
 
         init_dist = max(0, self.unit.stunned - self.board.tick)
-        opp_id = 'a' if player.id == 'b' else 'b'
-        self.safe_dists[unit_id] = (0, None)
+        self.safe_dists[unit_idx] = (0, None)
         queue = [(init_dist, 0, self)]
+        push_order = itertools.count(1)
         while queue:
             dist, _, cell = heapq.heappop(queue)
 
@@ -310,7 +361,7 @@ class Cell:
                 # We know that prev_cell is ok at tick + dist - 1
                 #               and cell is ok at tick + dist + safe_wait
                 # Need to confirm tick + dist through tick + dist + safe_wait - 1
-                prev_cell = cell.safe_dists[unit_id][1]
+                prev_cell = cell.safe_dists[unit_idx][1]
                 prev_safe, prev_safe_wait = prev_cell.is_safe(player, self.board.tick + dist + i, self.unit.invulnerable)
                 if (not prev_safe and not prev_cell is self) or prev_safe_wait != 0:
                     wait_is_ok = False
@@ -320,9 +371,9 @@ class Cell:
 
             for new_cell in cell.search_neighbors(player):
                 new_dist = dist + safe_wait + 1
-                if new_dist < new_cell.safe_dists[unit_id][0]:
-                    new_cell.safe_dists[unit_id] = (new_dist, cell)
-                    heapq.heappush(queue, (new_dist, random.random(), new_cell))
+                if new_dist < new_cell.safe_dists[unit_idx][0]:
+                    new_cell.safe_dists[unit_idx] = (new_dist, cell)
+                    heapq.heappush(queue, (new_dist, next(push_order), new_cell))
 
     def _init_neighbors(self):
         self.west = self.neighbor(-1, 0)
@@ -331,6 +382,7 @@ class Cell:
         self.south = self.neighbor(0, -1)
 
     def _on_entity_spawned(self, payload):
+        self.board.zobrist ^= self._entity_key()
         etype = payload['type']
         self.created = payload['created']
         self.expires = payload.get('expires')
@@ -353,12 +405,17 @@ class Cell:
         if self.fire and self.expires is None: # end-of-game fire
             # TODO: set next EOG fire future_fire values
             self.expires = 2000
+        self.board.zobrist ^= self._entity_key()
 
 
 class Unit:
+    __slots__ = ('board', 'id', 'idx', 'x', 'y', 'cell', 'player', 'hp', 'diameter', 'invulnerable',
+                 'stunned', 'bombs')
+
     def __init__(self, board, id):
         self.board = board
         self.id = id
+        self.idx = UNIT_IDS.index(id)
         self.x, self.y = None, None
         self.cell = None
         self.player = None
@@ -377,26 +434,36 @@ class Unit:
         unit.stunned = self.stunned
         # Need cell, player, bombs
         unit.player = self.player.id
-        unit.bombs = [SIZE * bomb_cell.y + bomb_cell.x for bomb_cell in self.bombs]
+        unit.bombs = [self.board.width * bomb_cell.y + bomb_cell.x for bomb_cell in self.bombs]
         return unit
 
     def _update_dists(self):
-        self.cell._update_safe_dists_to_all(self.id, self.player)
-        #self.cell._update_safe_paths(self.id, self.player)
+        self.cell._update_safe_dists_to_all(self.idx, self.player)
+        #self.cell._update_safe_paths(self.idx, self.player)
+
+    def _key(self):
+        '''Zobrist key of the unit's state, see Board.hash'''
+        if self.cell is None:
+            return 0
+        return zobrist_key(ZOBRIST_UNIT, self.idx, self.y * self.board.width + self.x, self.hp, self.diameter,
+                           self.invulnerable, self.stunned)
 
     def _on_unit_state(self, payload):
+        self.board.zobrist ^= self._key()
         if self.cell and self.cell.unit == self:
             self.cell.unit = None
         self.x, self.y = payload['coordinates']
-        self.cell = self.board.cells[self.y * SIZE + self.x]
+        self.cell = self.board.cell(self.x, self.y)
         self.cell.unit = self
-        self.player = self.board.players['a'] if payload['agent_id'] == 'a' else self.board.players['b']
+        self.player = self.board.players[payload['agent_id']]
         self.hp = payload['hp']
         self.diameter = payload['blast_diameter']
         self.invulnerable = payload['invulnerable']
         self.stunned = payload['stunned']
+        self.board.zobrist ^= self._key()
 
     def _on_unit_move(self, move_action):
+        self.board.zobrist ^= self._key()
         if self.cell.unit == self:
             self.cell.unit = None
         if move_action == "up":
@@ -407,20 +474,25 @@ class Unit:
             self.x += 1
         elif move_action == "left":
             self.x -= 1
-        self.cell = self.board.cells[self.y * SIZE + self.x]
+        self.cell = self.board.cell(self.x, self.y)
         self.cell.unit = self
+        self.board.zobrist ^= self._key()
 
 
 class Player:
+    __slots__ = ('board', 'id', 'idx', 'opp', 'units', 'bombs')
+
     def __init__(self, board, id):
         self.board = board
         self.id = id
+        self.idx = PLAYER_IDS.index(id)
+        self.opp = None # Opponent Player, set by Board
         self.units = []
         self.bombs = []
 
     def copy(self, new_board):
         player = Player(new_board, self.id)
-        return player # Still need units and bombs
+        return player # Still need opp, units and bombs
 
     def get_hp_score(self):
         '''Per agent: 1 if full health, 0 if dead'''
@@ -444,18 +516,18 @@ class Player:
     def get_imminent_danger_score(self):
         '''Per unit: 1 if not in danger, 0 if in imminent danger'''
         score = 0
-        opp_id = 'a' if self.id == 'b' else 'b'
+        own_idx, opp_idx = self.idx, OPPONENT[self.idx]
         units = [u for u in self.units if u.hp > 0]
         for unit in units:
             safe_turns = unit.cell.safe_turns(unit.player, unit.invulnerable)
             if safe_turns < 4:
                 score += 0.1 * max(0, safe_turns)
             else:
-                if (self.id in unit.cell.future_fire_end
-                    and unit.cell.future_fire_end[self.id] - 5 <= unit.stunned + 1):
+                if (unit.cell.future_fire_end[own_idx] is not None
+                    and unit.cell.future_fire_end[own_idx] - 5 <= unit.stunned + 1):
                     continue # bad - 0 score
-                if (opp_id in unit.cell.future_fire_start
-                    and unit.cell.future_fire_start[opp_id] <= unit.stunned + 1):
+                if (unit.cell.future_fire_start[opp_idx] is not None
+                    and unit.cell.future_fire_start[opp_idx] <= unit.stunned + 1):
                     continue # bad - 0 score
                 score += 1
         return score / len(units) if len(units) else 0
@@ -474,9 +546,9 @@ class Player:
                     continue
                 target_range_i = min(len(cell.target_range) - 1, ((unit.diameter // 2) - 1))
                 target_range = cell.target_range[target_range_i]
-                target_range = target_range if (unit.player.id == 'a') else -target_range
+                target_range = target_range if (unit.player.idx == 0) else -target_range
                 if target_range >= 0.02:  # at least 2 ore boxes
-                    safe_dist = cell.safe_dists[unit.id][0]
+                    safe_dist = cell.safe_dists[unit.idx][0]
                     if safe_dist != UNREACHABLE:
                         possible_goals.append((cell, safe_dist, target_range))
             if possible_goals:
@@ -500,7 +572,7 @@ class Player:
         for bomb_cell in self.bombs:
             target_range_i = min(len(bomb_cell.target_range) - 1, ((bomb_cell.bomb_diameter // 2) - 1))
             target_range = bomb_cell.target_range[target_range_i]
-            target_range = target_range if (self.id == 'a') else -target_range
+            target_range = target_range if (self.idx == 0) else -target_range
             if bomb_cell.unit:
                 score += min(2, target_range % 10) / 2 # Want to step away
             else:
@@ -516,17 +588,17 @@ class Player:
         close_units = {}
         for cell in self.board.cells:
             if cell.freeze_powerup and not cell.unit:
-                min_unit_id, min_safe_dist = None, UNREACHABLE
-                for unit_id in self.board.units:
-                    safe_dist = cell.safe_dists[unit_id][0]
-                    #print(f'freeze at {cell.x},{cell.y} dist {safe_dist} to unit {unit_id}')
+                min_unit, min_safe_dist = None, UNREACHABLE
+                for unit in self.board.units.values():
+                    safe_dist = cell.safe_dists[unit.idx][0]
+                    #print(f'freeze at {cell.x},{cell.y} dist {safe_dist} to unit {unit.id}')
                     if safe_dist < min_safe_dist:
-                        min_unit_id, min_safe_dist = unit_id, safe_dist
-                if min_unit_id is None:
+                        min_unit, min_safe_dist = unit, safe_dist
+                if min_unit is None:
                     continue
-                if self.board.units[min_unit_id] in self.units:
-                    if min_unit_id not in close_units or min_safe_dist < close_units[min_unit_id]:
-                        close_units[min_unit_id] = min_safe_dist
+                if min_unit in self.units:
+                    if min_unit not in close_units or min_safe_dist < close_units[min_unit]:
+                        close_units[min_unit] = min_safe_dist
         for close_unit_dist in close_units.values():
             score += max(0, 10 - close_unit_dist)
         return score / (20 * len(units)) if len(units) else 0
@@ -538,17 +610,17 @@ class Player:
         close_units = {}
         for cell in self.board.cells:
             if cell.blast_powerup and not cell.unit:
-                min_unit_id, min_safe_dist = None, UNREACHABLE
-                for unit_id in self.board.units:
-                    safe_dist = cell.safe_dists[unit_id][0]
-                    #print(f'blast at {cell.x},{cell.y} dist {safe_dist} to unit {unit_id}')
+                min_unit, min_safe_dist = None, UNREACHABLE
+                for unit in self.board.units.values():
+                    safe_dist = cell.safe_dists[unit.idx][0]
+                    #print(f'blast at {cell.x},{cell.y} dist {safe_dist} to unit {unit.id}')
                     if safe_dist < min_safe_dist:
-                        min_unit_id, min_safe_dist = unit_id, safe_dist
-                if min_unit_id is None:
+                        min_unit, min_safe_dist = unit, safe_dist
+                if min_unit is None:
                     continue
-                if self.board.units[min_unit_id] in self.units:
-                    if min_unit_id not in close_units or min_safe_dist < close_units[min_unit_id]:
-                        close_units[min_unit_id] = min_safe_dist
+                if min_unit in self.units:
+                    if min_unit not in close_units or min_safe_dist < close_units[min_unit]:
+                        close_units[min_unit] = min_safe_dist
         for close_unit_dist in close_units.values():
             score += max(0, 10 - close_unit_dist)
         return score / (10 * len(units)) if len(units) else 0
@@ -556,8 +628,7 @@ class Player:
     def get_opp_stun_score(self):
         '''Per opp unit: 0 is not stunned, 1 is stunned'''
         score = 0
-        opp_id = 'a' if self.id == 'b' else 'b'
-        opp_units = [u for u in self.board.players[opp_id].units if u.hp > 0]
+        opp_units = [u for u in self.opp.units if u.hp > 0]
         for opp_unit in opp_units:
             if opp_unit.stunned > opp_unit.invulnerable:
                 score += 1
@@ -573,11 +644,10 @@ class Player:
 
     def get_safety_score(self):
         '''Per unit: 1 truly safe, 0 for future opp and near-term own'''
-        opp_id = 'a' if self.id == 'b' else 'b'
         score = 0
         units = [u for u in self.units if u.hp > 0]
         for unit in units:
-            score += unit.cell.safety_scores[self.id]
+            score += unit.cell.safety_scores[self.idx]
             #score += 1
             #if self.id in unit.cell.future_fire_start:
             #    score -= 0.3
@@ -632,22 +702,130 @@ class Player:
         
 
 
+class BoardKernels:
+    '''numpy versions of the safety score passes and target ranges, giving the same floats as the python loops'''
+    SAFETY_PASSES = 3
+
+    def __init__(self, width, height):
+        num_cells = width * height
+        xs = np.arange(num_cells) % width
+        ys = np.arange(num_cells) // width
+
+        self.num_cells = num_cells
+        self.diagonals = width + height - 1
+        # Each pass sees its own south and west scores but the previous pass's north and east ones.
+        # Cells on an x + y diagonal don't touch, so skew[x + y + 1][y + 1] makes each diagonal a row
+        # and pass p updates diagonal k on step k + 2 * p, running all the passes in one sweep.
+        self.skew = np.zeros((NUM_PLAYERS, self.diagonals + 2, height + 2))
+        self.tenth = np.zeros(self.skew.shape) # 0.1 * skew, kept in step
+        self.open = np.zeros(self.skew.shape[1:], dtype=bool)
+        self.skew_idx = (xs + ys + 1) * (height + 2) + ys + 1
+        self.safety_steps = []
+        for step in range(self.diagonals + 2 * (self.SAFETY_PASSES - 1)):
+            diagonals = [step - 2 * i for i in range(self.SAFETY_PASSES)
+                         if 0 <= step - 2 * i < self.diagonals]
+            low, high = diagonals[-1] + 1, diagonals[0] + 1 # skew rows
+            rows, next_rows, prev_rows = (slice(low, high + 1, 2), slice(low + 1, high + 2, 2),
+                                          slice(low - 1, high, 2))
+            self.safety_steps.append((
+                self.skew[:, rows, 1:-1], self.tenth[:, rows, 1:-1], self.open[rows, 1:-1],
+                self.tenth[:, next_rows, 2:], # north
+                self.tenth[:, prev_rows, 1:-1], # west
+                self.tenth[:, next_rows, 1:-1], # east
+                self.tenth[:, prev_rows, :-2], # south
+                np.zeros((NUM_PLAYERS, len(diagonals), height))))
+
+        self.rays = np.full((4, TARGET_RANGE_LEN, num_cells), num_cells) # north, south, east, west; num_cells past the edge
+        for i, (dx, dy) in enumerate(((0, 1), (0, -1), (1, 0), (-1, 0))):
+            for dist in range(TARGET_RANGE_LEN):
+                x, y = xs + dx * (dist + 1), ys + dy * (dist + 1)
+                inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+                self.rays[i][dist] = np.where(inside, y * width + x, num_cells)
+        self.stop = np.ones(num_cells + 1, dtype=bool) # [pos], True past the edge
+        self.last = np.zeros(num_cells + 1, dtype=bool)
+        self.found = np.zeros(num_cells + 1)
+
+    def safety_scores(self, scores, open_cells):
+        '''scores: [player_idx][pos] starting scores, open_cells: [pos] cells the passes update'''
+        skew = self.skew.reshape(NUM_PLAYERS, -1)
+        skew[:, self.skew_idx] = scores
+        self.open.reshape(-1)[self.skew_idx] = open_cells
+        np.multiply(self.skew, 0.1, out=self.tenth)
+        for cells, tenth, open_cells, north, west, east, south, out in self.safety_steps:
+            np.multiply(cells, 0.6, out=out)
+            np.add(out, north, out=out)
+            np.add(out, west, out=out)
+            np.add(out, east, out=out)
+            np.add(out, south, out=out)
+            np.copyto(cells, out, where=open_cells)
+            np.multiply(cells, 0.1, out=tenth)
+        return skew[:, self.skew_idx]
+
+    def target_ranges(self, wall, box, powerup, values):
+        '''[pos] lists in, [i][pos] target ranges out, summed in the python loop's order'''
+        stop, last, found, num_cells = self.stop, self.last, self.found, self.num_cells
+        wall = np.asarray(wall, dtype=bool)
+        last[:num_cells] = box
+        stop[:num_cells] = powerup
+        stop[:num_cells] |= wall
+        found[:num_cells] = values
+        ended = stop[self.rays] # rays end before walls/powerups
+        ended[:, 1:] |= last[self.rays[:, :-1]] # and after boxes
+        reached = ~np.logical_or.accumulate(ended, axis=1)
+        reached &= ~(wall | last[:num_cells]) # no rays from walls or boxes
+        found = np.where(reached, found[self.rays], 0.0)
+        target_ranges = np.zeros((TARGET_RANGE_LEN, num_cells))
+        for direction, dist in zip(*np.nonzero(found.any(axis=2))): # adding 0.0s changes nothing
+            target_ranges[dist:] += found[direction, dist]
+        return target_ranges
+
+
 class Board:
-    def __init__(self):
+    _kernels_by_size = {} # (width, height): BoardKernels, shared by the numpy backend boards of that size
+
+    def __init__(self, backend='python', safety_scores='python'):
+        if backend == 'numpy' and np is None:
+            print('WARNING: numpy is not installed, falling back to python board backend')
+            backend = 'python'
+        self.backend = backend
+        if safety_scores == 'numpy' and backend != 'numpy':
+            print('WARNING: numpy safety scores need the numpy board backend, using python')
+            safety_scores = 'python'
+        self.safety_scores = safety_scores # 'numpy' is exact but slower than the python passes on 15x15
+        self._kernels = None
         self.tick = None
+        self.width = None
+        self.height = None
+        self.num_cells = None
         self.agent_id = None
+        self.seed = None # Replays the searches' tie-breaks, shared by copies
+        self._random = None
+        self.neighbor_order = None # [pos]: NEIGHBOR_ORDERS index of the cell's search order this tick
+        self.zobrist = 0 # XOR of the Zobrist keys of every unit and cell, see hash
         self.cells = None
         self.players = None
         self.units = None
         self.player = None
         self.opp = None
 
-    def init_from_game_state(self, game_state):
+    def init_from_game_state(self, game_state, seed=None):
         self.tick = 0
-
-        self.cells = [Cell(self, i) for i in range(SIZE2)]
-        self.players = {player_id: Player(self, player_id) for player_id in ['a','b']}
-        self.units = {unit_id: Unit(self, unit_id) for unit_id in ['c','d','e','f','g','h']}
+        self.width = game_state['world']['width']
+        self.height = game_state['world']['height']
+        self.num_cells = self.width * self.height
+        if self.backend == 'numpy':
+            size = self.width, self.height
+            if size not in Board._kernels_by_size:
+                Board._kernels_by_size[size] = BoardKernels(*size)
+            self._kernels = Board._kernels_by_size[size]
+        self.seed = random.randrange(1 << 32) if seed is None else seed
+        self._random = random.Random(self.seed)
+        self._draw_neighbor_orders()
+
+        self.cells = [Cell(self, i) for i in range(self.num_cells)]
+        self.players = {player_id: Player(self, player_id) for player_id in PLAYER_IDS}
+        self.units = {unit_id: Unit(self, unit_id) for unit_id in UNIT_IDS}
+        self._init_opponents()
 
         for unit_id in game_state['unit_state']:
             self.units[unit_id]._on_unit_state(game_state['unit_state'][unit_id])
@@ -662,25 +840,38 @@ class Board:
             self._on_entity_spawned(entity)
 
         self.agent_id = game_state['connection']['agent_id']
-        self.player = self.players['a'] if self.agent_id == 'a' else self.players['b']
-        self.opp = self.players['a'] if self.agent_id == 'b' else self.players['b']
+        self.player = self.players[self.agent_id]
+        self.opp = self.player.opp
+
+    def _draw_neighbor_orders(self):
+        '''New random neighbor orders for every cell, the searches' tie-breaks until the next tick'''
+        self.neighbor_order = self._random.choices(range(len(NEIGHBOR_ORDERS)), k=self.num_cells)
+
+    def _init_opponents(self):
+        for player in self.players.values():
+            player.opp = self.players[PLAYER_IDS[OPPONENT[player.idx]]]
 
     def copy(self):
-        board = Board()
+        board = Board(self.backend, self.safety_scores)
         board.tick = self.tick
+        board.width, board.height, board.num_cells = self.width, self.height, self.num_cells
+        board._kernels = self._kernels
         board.agent_id = self.agent_id
+        board.seed, board._random, board.neighbor_order = self.seed, self._random, self.neighbor_order
+        board.zobrist = self.zobrist
         board.cells = [cell.copy(board) for cell in self.cells]
         board.players = {player_id: player.copy(board) for player_id, player in self.players.items()}
         board.units = {unit_id: unit.copy(board) for unit_id, unit in self.units.items()}
-        board.player = board.players['a'] if board.agent_id == 'a' else board.players['b']
-        board.opp = board.players['a'] if board.agent_id == 'b' else board.players['b']
+        board._init_opponents()
+        board.player = board.players[board.agent_id]
+        board.opp = board.player.opp
 
         # Each Player needs .units, .bombs
         for new_player in board.players.values():
             for old_unit in self.players[new_player.id].units:
                 new_player.units.append(board.units[old_unit.id])
             for old_bomb_cell in self.players[new_player.id].bombs:
-                new_player.bombs.append(board.cells[SIZE * old_bomb_cell.y + old_bomb_cell.x])
+                new_player.bombs.append(board.cell(old_bomb_cell.x, old_bomb_cell.y))
 
         # Each cell needs .unit, .bomb_unit
         for new_cell in board.cells:
@@ -692,13 +883,10 @@ class Board:
 
         # Each Unit needs .cell, .player, .bombs
         for new_unit in board.units.values():
-            new_unit.cell = board.cells[SIZE * new_unit.y + new_unit.x]
+            new_unit.cell = board.cell(new_unit.x, new_unit.y)
             new_unit.player = board.players[new_unit.player] # .player initialized to id
             new_unit.bombs = [board.cells[bomb_pos] for bomb_pos in new_unit.bombs]
 
-        for new_cell in board.cells:
-            new_cell.future_fire_start.clear()
-            new_cell.future_fire_end.clear()
         for new_cell in board.cells:
             if new_cell.bomb_diameter:
                 board._on_bomb_placed(new_cell)
@@ -717,6 +905,11 @@ class Board:
         return score, desc
 
     def apply_detonation(self, blast_cell):
+        self.zobrist ^= blast_cell._entity_key()
+        self._apply_detonation(blast_cell)
+        self.zobrist ^= blast_cell._entity_key()
+
+    def _apply_detonation(self, blast_cell):
         # reduce box hp (remove box), remove powerup
         blast_cell.freeze_powerup = blast_cell.blast_powerup = False
         if blast_cell.wall:
@@ -728,12 +921,14 @@ class Board:
                 blast_cell.blast_powerup = True # TODO chance of freeze?
                 return # no fire
         if blast_cell.bomb_diameter:
-            self.units[blast_cell.bomb_unit.id].bombs.remove(blast_cell)
-            self.players[blast_cell.bomb_unit.player.id].bombs.remove(blast_cell)
+            blast_cell.bomb_unit.bombs.remove(blast_cell)
+            blast_cell.bomb_unit.player.bombs.remove(blast_cell)
             blast_cell.bomb_diameter = blast_cell.bomb_unit = None
         if blast_cell.unit and blast_cell.unit.invulnerable < self.tick:
+            self.zobrist ^= blast_cell.unit._key()
             blast_cell.unit.hp -= 1
             blast_cell.unit.invulnerable = self.tick + 5
+            self.zobrist ^= blast_cell.unit._key()
             blast_cell.fire = True
             blast_cell.created = self.tick
             blast_cell.expires = self.tick + 5
@@ -746,14 +941,16 @@ class Board:
 
         for cell in self.cells:
             if cell.fire and cell.expires == self.tick:
+                self.zobrist ^= cell._entity_key()
                 cell.fire = None
                 cell.created = None
                 cell.expires = None
+                self.zobrist ^= cell._entity_key()
 
         while detonate_actions:
             for action in detonate_actions:
                 _, unit_id, det_x, det_y = action
-                blast_cells = self.get_bomb_area(self.cells[SIZE * det_y + det_x])
+                blast_cells = self.get_bomb_area(self.cell(det_x, det_y))
                 for blast_cell in blast_cells:
                     self.apply_detonation(blast_cell)
             detonate_actions = []
@@ -766,10 +963,12 @@ class Board:
             unit = self.units[unit_id]
             if len(unit.player.bombs) == 3 or unit.cell.bomb_diameter:
                 continue
+            self.zobrist ^= unit.cell._entity_key()
             unit.cell.bomb_diameter = unit.diameter
             unit.cell.bomb_unit = unit
             unit.cell.created = self.tick
             unit.cell.expires = self.tick + 5
+            self.zobrist ^= unit.cell._entity_key()
             unit.bombs.append(unit.cell)
             unit.player.bombs.append(unit.cell)
             if unit.cell.fire:
@@ -791,7 +990,7 @@ class Board:
             move_uids = [uid for _, uid, _, _ in move_actions]
             remove_move_actions = set()
             for i, (_, _, x, y) in enumerate(move_actions):
-                cell = self.cells[SIZE * y + x]
+                cell = self.cell(x, y)
                 if cell.wall or cell.box or cell.bomb_diameter or (cell.unit and not cell.unit.id in move_uids):
                     remove_move_actions.add(move_actions[i])
             for remove_move_action in remove_move_actions:
@@ -800,12 +999,14 @@ class Board:
                 break
         for _, uid, x, y in move_actions:
             unit = self.units[uid]
+            self.zobrist ^= unit._key()
             if unit.cell.unit == unit:
                 unit.cell.unit = None
             unit.x = x
             unit.y = y
-            self.cells[SIZE * y + x].unit = unit
-            unit.cell = self.cells[SIZE * y + x]
+            self.cell(x, y).unit = unit
+            unit.cell = self.cell(x, y)
+            self.zobrist ^= unit.cell._entity_key()
             if unit.cell.fire and unit.invulnerable < self.tick:
                 #print('SIMULATE FIRE DAMAGE FROM MOVEMENT')
                 unit.hp -= 1
@@ -815,16 +1016,18 @@ class Board:
                 unit.diameter += 2
             elif unit.cell.freeze_powerup:
                 unit.cell.freeze_powerup = False
-                opp_id = 'a' if unit.player.id == 'b' else 'b'
                 opp_units = [u for u in self.units.values()
-                             if u.player.id == opp_id and u.hp > 0 and u.stunned < self.tick + 1]
+                             if u.player is unit.player.opp and u.hp > 0 and u.stunned < self.tick + 1]
                 if opp_units:
-                    stun_opp = random.choice(opp_units)
+                    stun_opp = self._random.choice(opp_units)
+                    self.zobrist ^= stun_opp._key()
                     stun_opp.stunned = self.tick + 15
+                    self.zobrist ^= stun_opp._key()
+            self.zobrist ^= unit.cell._entity_key() ^ unit._key()
 
         for cell in self.cells:
-            cell.future_fire_start = {}
-            cell.future_fire_end = {}
+            cell.future_fire_start = list(NO_FUTURE_FIRE)
+            cell.future_fire_end = list(NO_FUTURE_FIRE)
         for cell in self.cells:
             if cell.bomb_diameter:
                 self._on_bomb_placed(cell)
@@ -832,7 +1035,20 @@ class Board:
         self._update_target_range()
 
     def cell(self, x, y):
-        return self.cells[y * SIZE + x]
+        return self.cells[y * self.width + x]
+
+    def hash(self):
+        '''Zobrist hash of the units and entities, kept up to date by the event handlers and apply_actions'''
+        return self.zobrist
+
+    def _compute_hash(self):
+        '''hash() from scratch'''
+        key = 0
+        for unit in self.units.values():
+            key ^= unit._key()
+        for cell in self.cells:
+            key ^= cell._entity_key()
+        return key
 
     def get_bomb_area(self, cell, diameter=None):
         bomb_cells = set()
@@ -865,48 +1081,62 @@ class Board:
         #    cell.safe_paths = None
         for unit in self.units.values():
             unit._update_dists()
+        open_cells = []
         for cell in self.cells:
             if (cell.fire or cell.wall or cell.box
                 or cell.bomb_diameter
                 or (cell.unit and cell.unit.stunned >= self.tick + 1)
                 or (cell.unit and cell.unit.hp <= 0)):
-                cell.safety_scores['a'] = 0
-                cell.safety_scores['b'] = 0
+                cell.safety_scores[0] = 0
+                cell.safety_scores[1] = 0
+                open_cells.append(False)
             else:
-                cell.safety_scores['a'] = 1
-                cell.safety_scores['b'] = 1
-                if 'a' in cell.future_fire_start:
-                    cell.safety_scores['a'] -= 0.1
-                    cell.safety_scores['b'] -= 0.5
-                    if cell.future_fire_start['a'] + 10 < self.tick + 1:
-                        cell.safety_scores['a'] -= 0.4
-                if 'b' in cell.future_fire_start:
-                    cell.safety_scores['b'] -= 0.1
-                    cell.safety_scores['a'] -= 0.5
-                    if cell.future_fire_start['b'] + 10 < self.tick + 1:
-                        cell.safety_scores['b'] -= 0.4
+                open_cells.append(True)
+                cell.safety_scores[0] = 1
+                cell.safety_scores[1] = 1
+                if cell.future_fire_start[0] is not None:
+                    cell.safety_scores[0] -= 0.1
+                    cell.safety_scores[1] -= 0.5
+                    if cell.future_fire_start[0] + 10 < self.tick + 1:
+                        cell.safety_scores[0] -= 0.4
+                if cell.future_fire_start[1] is not None:
+                    cell.safety_scores[1] -= 0.1
+                    cell.safety_scores[0] -= 0.5
+                    if cell.future_fire_start[1] + 10 < self.tick + 1:
+                        cell.safety_scores[1] -= 0.4
+        if self.safety_scores == 'numpy':
+            scores = self._kernels.safety_scores(
+                [[cell.safety_scores[player_idx] for cell in self.cells] for player_idx in range(NUM_PLAYERS)],
+                open_cells)
+            for cell, score_a, score_b in zip(self.cells, *scores.tolist()):
+                cell.safety_scores[0] = score_a
+                cell.safety_scores[1] = score_b
+            return
         for _ in range(3):
             for cell in self.cells:
                 if (cell.fire or cell.wall or cell.box or cell.bomb_diameter
                     or (cell.unit and cell.unit.stunned >= self.tick + 1)
                     or (cell.unit and cell.unit.hp <= 0)):
                     continue
-                cell.safety_scores['a'] = (
-                    0.6 * cell.safety_scores['a']
-                    + (0.1 * cell.north.safety_scores['a'] if cell.north else 0)
-                    + (0.1 * cell.west.safety_scores['a'] if cell.west else 0)
-                    + (0.1 * cell.east.safety_scores['a'] if cell.east else 0)
-                    + (0.1 * cell.south.safety_scores['a'] if cell.south else 0))
-                cell.safety_scores['b'] = (
-                    0.6 * cell.safety_scores['b']
-                    + (0.1 * cell.north.safety_scores['b'] if cell.north else 0)
-                    + (0.1 * cell.west.safety_scores['b'] if cell.west else 0)
-                    + (0.1 * cell.east.safety_scores['b'] if cell.east else 0)
-                    + (0.1 * cell.south.safety_scores['b'] if cell.south else 0))
+                cell.safety_scores[0] = (
+                    0.6 * cell.safety_scores[0]
+                    + (0.1 * cell.north.safety_scores[0] if cell.north else 0)
+                    + (0.1 * cell.west.safety_scores[0] if cell.west else 0)
+                    + (0.1 * cell.east.safety_scores[0] if cell.east else 0)
+                    + (0.1 * cell.south.safety_scores[0] if cell.south else 0))
+                cell.safety_scores[1] = (
+                    0.6 * cell.safety_scores[1]
+                    + (0.1 * cell.north.safety_scores[1] if cell.north else 0)
+                    + (0.1 * cell.west.safety_scores[1] if cell.west else 0)
+                    + (0.1 * cell.east.safety_scores[1] if cell.east else 0)
+                    + (0.1 * cell.south.safety_scores[1] if cell.south else 0))
 
 
     def _update_target_range(self):
         '''Positive if it favors player a, negative for player b'''
+        if self.backend == 'numpy':
+            self._update_target_range_numpy()
+            return
         for cell in self.cells:
             for i in range(len(cell.target_range)):
                 cell.target_range[i] = 0
@@ -920,64 +1150,88 @@ class Board:
                     if not nearby_cell or nearby_cell.wall or nearby_cell.blast_powerup or nearby_cell.freeze_powerup:
                         break
                     if nearby_cell.box:
-                        min_dist = { 'a': UNREACHABLE, 'b': UNREACHABLE }
-                        for unit_id, unit in self.units.items():
-                            if nearby_cell.safe_dists[unit_id][0] < min_dist[unit.player.id]: # todo safe dist to boxes?
-                                min_dist[unit.player.id] = nearby_cell.safe_dists[unit_id][0]
-                        multiplier = 0
-                        if min_dist['a'] < min_dist['b']:
-                            multiplier = 1
-                        elif min_dist['a'] > min_dist['b']:
-                            multiplier = -1
+                        value = self._box_target_value(nearby_cell)
                         for i in range(dist, len(cell.target_range)):
-                            cell.target_range[i] += multiplier / (10 ** (nearby_cell.hp - 1)) # 1, 0.1, 0.01
+                            cell.target_range[i] += value
                         break
-                    if (nearby_cell.unit
-                        and nearby_cell.unit.hp > 0 # not dead
-                        and nearby_cell.unit.stunned >= self.tick + 1 + 5): # still stunned when bomb can go off
-                        multiplier = 1 if (nearby_cell.unit.player.id == 'b') else -1
+                    value = self._unit_target_value(nearby_cell)
+                    if value:
                         for i in range(dist, len(cell.target_range)):
-                            cell.target_range[i] += multiplier * 20
+                            cell.target_range[i] += value
         #print(f'Target range values:')
-        #for y in range(SIZE - 1, -1, -1):
+        #for y in range(self.height - 1, -1, -1):
         #    s = ''
-        #    for cell in self.cells[(y * SIZE):(y * SIZE + SIZE)]:
+        #    for cell in self.cells[(y * self.width):(y * self.width + self.width)]:
         #        s += str((cell.target_range[0], cell.target_range[1])) + '\t'
         #    print(s)
 
-    def _on_bomb_placed(self, cell, start=None, end=None, player_id=None, bombs_processed=None):
+    def _update_target_range_numpy(self):
+        values = [0] * self.num_cells
+        for pos, cell in enumerate(self.cells):
+            if cell.box:
+                values[pos] = self._box_target_value(cell)
+            elif cell.unit:
+                values[pos] = self._unit_target_value(cell)
+        target_ranges = self._kernels.target_ranges(
+            [cell.wall for cell in self.cells], [bool(cell.box) for cell in self.cells],
+            [bool(cell.blast_powerup or cell.freeze_powerup) for cell in self.cells], values)
+        for cell, target_range in zip(self.cells, target_ranges.T.tolist()):
+            cell.target_range = target_range
+
+    def _box_target_value(self, box_cell):
+        '''1 / -1 / 0 by which player is closer to the box, over 10 ** (hp - 1)'''
+        min_dist = [UNREACHABLE] * NUM_PLAYERS
+        for unit in self.units.values():
+            if box_cell.safe_dists[unit.idx][0] < min_dist[unit.player.idx]: # todo safe dist to boxes?
+                min_dist[unit.player.idx] = box_cell.safe_dists[unit.idx][0]
+        multiplier = 0
+        if min_dist[0] < min_dist[1]:
+            multiplier = 1
+        elif min_dist[0] > min_dist[1]:
+            multiplier = -1
+        return multiplier / (10 ** (box_cell.hp - 1)) # 1, 0.1, 0.01
+
+    def _unit_target_value(self, cell):
+        '''20 / -20 for a stunned unit on the cell, else 0'''
+        if (cell.unit
+            and cell.unit.hp > 0 # not dead
+            and cell.unit.stunned >= self.tick + 1 + 5): # still stunned when bomb can go off
+            return (1 if (cell.unit.player.idx == 1) else -1) * 20
+        return 0
+
+    def _on_bomb_placed(self, cell, start=None, end=None, player_idx=None, bombs_processed=None):
         '''Can be called more than once, and on different ticks'''
         if start is None and end is None:
             start, end = cell.created + 5, cell.expires + 5
-        if player_id is None:
-            player_id = cell.bomb_unit.player.id
+        if player_idx is None:
+            player_idx = cell.bomb_unit.player.idx
         if bombs_processed is None:
             bombs_processed = [cell]
         radius = (cell.bomb_diameter // 2) + 1
 
-        def _set_future_fire(cell, count, direction, player_id, bombs_processed):
+        def _set_future_fire(cell, count, direction, player_idx, bombs_processed):
             if cell is None or count == 0 or cell.box or cell.wall:
                 return
-            if player_id in cell.future_fire_start: # Take the conservative start/end if overlapping
-                cell.future_fire_start[player_id] = min(cell.future_fire_start[player_id], start)
-                cell.future_fire_end[player_id] = min(cell.future_fire_end[player_id], end)
+            if cell.future_fire_start[player_idx] is not None: # Take the conservative start/end if overlapping
+                cell.future_fire_start[player_idx] = min(cell.future_fire_start[player_idx], start)
+                cell.future_fire_end[player_idx] = min(cell.future_fire_end[player_idx], end)
             else:
-                cell.future_fire_start[player_id], cell.future_fire_end[player_id] = start, end
-            _set_future_fire(getattr(cell, direction), count - 1, direction, player_id, bombs_processed)
+                cell.future_fire_start[player_idx], cell.future_fire_end[player_idx] = start, end
+            _set_future_fire(getattr(cell, direction), count - 1, direction, player_idx, bombs_processed)
 
             if cell.bomb_diameter and cell not in bombs_processed:
                 bombs_processed.append(cell)
-                self._on_bomb_placed(cell, start=start, end=end, player_id=player_id, bombs_processed=bombs_processed)
+                self._on_bomb_placed(cell, start=start, end=end, player_idx=player_idx, bombs_processed=bombs_processed)
 
         for direction in ('north', 'south', 'east', 'west'):
-            _set_future_fire(cell, radius, direction, player_id, bombs_processed)
+            _set_future_fire(cell, radius, direction, player_idx, bombs_processed)
 
     def _on_entity_spawned(self, payload):
         x, y = payload['x'], payload['y']
-        self.cells[y * SIZE + x]._on_entity_spawned(payload)
+        self.cell(x, y)._on_entity_spawned(payload)
 
     def _on_entity_expired(self, x, y):
-        self.cells[y * SIZE + x]._on_entity_expired()
+        self.cell(x, y)._on_entity_expired()
 
     def _on_unit_state(self, payload):
         unit_id = payload['unit_id']
@@ -985,8 +1239,12 @@ class Board:
 
 
 class GameState:
-    def __init__(self, connection_string: str):
+    def __init__(self, connection_string: str, backend: str = 'python', seed: int = None,
+                 safety_scores: str = 'python'):
         self._connection_string = connection_string
+        self._backend = backend
+        self._safety_scores = safety_scores
+        self._seed = seed # Board.seed, random if None
         self.board = None
         self._tick_callback = None
 
@@ -1044,9 +1302,10 @@ class GameState:
 
     def _on_game_state(self, game_state):
         '''Recevie initial game state'''
-        self.board = Board()
-        self.board.init_from_game_state(game_state)
+        self.board = Board(self._backend, self._safety_scores)
+        self.board.init_from_game_state(game_state, seed=self._seed)
         self.board._client = self
+        print(f'Board seed {self.board.seed}')
 
     async def _on_game_tick(self, game_tick):
         tick_start_time = time.time()
@@ -1075,13 +1334,14 @@ class GameState:
 
         # Clear future fire tick values
         for cell in self.board.cells:
-            cell.future_fire_start.clear()
-            cell.future_fire_end.clear()
+            cell.future_fire_start = list(NO_FUTURE_FIRE)
+            cell.future_fire_end = list(NO_FUTURE_FIRE)
         # Update future fire tick values
         for cell in self.board.cells:
             if cell.bomb_diameter:
                 self.board._on_bomb_placed(cell)
         # Update unit->cell distances
+        self.board._draw_neighbor_orders()
         self.board._update_dists()
         self.board._update_target_range() # need dists first
 
@@ -0,0 +1,71 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import unittest
+
+from game_state import GameState, np
+
+
+REPLAY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'replay.json')
+
+
+def load_replay(num_ticks):
+    with open(REPLAY) as f:
+        payload = json.load(f)['payload']
+    initial_state = payload['initial_state']
+    initial_state.setdefault('connection', {'agent_id': 'a'})
+    return initial_state, payload['history'][:num_ticks]
+
+
+def replay(client, initial_state, history):
+    '''Yields client's board after each tick of history'''
+    with contextlib.redirect_stdout(io.StringIO()):
+        client._on_game_state(json.loads(json.dumps(initial_state)))
+    for game_tick in history:
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(client._on_game_tick(game_tick))
+        yield client.board
+
+
+async def on_tick(board):
+    pass
+
+
+class TestBoard(unittest.TestCase):
+    def test_hash_matches_recompute(self):
+        initial_state, history = load_replay(None)
+        client = GameState('', seed=0)
+        client.set_game_tick_callback(on_tick) # Sets board.tick
+        for board in replay(client, initial_state, history):
+            self.assertEqual(board.hash(), board._compute_hash())
+            if board.tick % 3: # Copies are slow, try actions every few ticks
+                continue
+            live_units = [unit for unit in board.units.values() if unit.hp > 0 and board.tick > unit.stunned]
+            moves = [('move', unit.id, move_cell.x, move_cell.y)
+                     for unit in live_units for move_cell in list(unit.cell.move_neighbors())[:1]]
+            bombs = [('bomb', unit.id) for unit in live_units]
+            detonates = [('detonate', unit.id, cell.x, cell.y) for unit in live_units for cell in unit.bombs][:1] # apply_actions handles one detonate per call
+            for actions in (moves, bombs, detonates, detonates + bombs + moves):
+                board_copy = board.copy()
+                self.assertEqual(board_copy.hash(), board.hash())
+                for _ in range(6): # Then let fire and bombs expire
+                    board_copy.apply_actions(actions)
+                    self.assertEqual(board_copy.hash(), board_copy._compute_hash())
+                    actions = []
+
+    @unittest.skipIf(np is None, 'numpy is not installed')
+    def test_numpy_kernels_match_python(self):
+        initial_state, history = load_replay(80)
+        python_boards = replay(GameState('', seed=0), initial_state, history)
+        numpy_boards = replay(GameState('', backend='numpy', seed=0, safety_scores='numpy'), initial_state, history)
+        for python_board, numpy_board in zip(python_boards, numpy_boards):
+            self.assertEqual(numpy_board.safety_scores, 'numpy')
+            for python_cell, numpy_cell in zip(python_board.cells, numpy_board.cells):
+                self.assertEqual(python_cell.safety_scores, numpy_cell.safety_scores)
+                self.assertEqual(python_cell.target_range, numpy_cell.target_range)
+
+
+if __name__ == '__main__':
+    unittest.main()
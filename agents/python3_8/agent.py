@@ -79,7 +79,7 @@ for cell in cells:
 
 '''
 
-from game_state import GameState, SIZE, UNREACHABLE
+from game_state import GameState, UNREACHABLE, popcount
 import asyncio
 import random
 import os
@@ -87,6 +87,10 @@ import time
 
 uri = os.environ.get(
     'GAME_CONNECTION_STRING') or "ws://127.0.0.1:3000/?role=agent&agentId=agentId&name=defaultName"
+backend = os.environ.get('BOARD_BACKEND') or 'python' # or 'numpy', slower on 15x15 (see bench.py)
+target_ranges = os.environ.get('BOARD_TARGET_RANGES') or 'incremental' # or 'numpy' (needs the numpy backend, slower)
+verify = os.environ.get('BOARD_VERIFY') == '1' # Check each tick's update against a full rebuild
+seed = int(os.environ['BOARD_SEED']) if os.environ.get('BOARD_SEED') else None # Replay a logged 'Board seed'
 
 g_tick_start = None
 
@@ -95,8 +99,10 @@ def goal_is_safe(board, unit, dest_cell):
     #if dest_cell is unit.cell:
     #    safe_paths = unit.cell.safe_paths
     #else:
-    if not dest_cell.future_fire_start:
+    if not dest_cell.has_future_fire():
         return True
+    if board.escape_dists(unit.player, unit.invulnerable)[dest_cell.pos] == UNREACHABLE:
+        return False # No truly safe cell in reach, skip the search
     #start_time = time.time()
     safe_paths, num_safe, num_truly_safe, max_safe_dist = dest_cell.get_safe_paths(unit.player, unit.invulnerable)
     #print(f'GOAL_IS_SAFE GET_SAFE_PATHS TIME {round((time.time() - start_time) * 1000)}')
@@ -108,7 +114,7 @@ def check_for_flee_danger_goal(board, unit):
         return None
     for dist in range(len(unit.cell.safe_paths) - 1, 0, -1): # backwards, don't check dist==0
         for safe_cell in unit.cell.safe_paths[dist]:
-            if not safe_cell.future_fire_start:
+            if not safe_cell.has_future_fire():
                 return safe_cell # Return furthest truly safe destination
     for dist in range(len(unit.cell.safe_paths) - 1, 0, -1): # backwards, don't check dist==0
         for safe_cell in unit.cell.safe_paths[dist]:
@@ -129,9 +135,8 @@ def can_detonate_for_damage(board, unit, bomb_cell, diameter=None):
     if not units_hit:
         return False
 
-    opp_id = 'a' if unit.player.id == 'b' else 'b'
-    own_units = [u for u in board.players[unit.player.id].units if u.hp > 0]
-    opp_units = [u for u in board.players[opp_id].units if u.hp > 0]
+    own_units = [u for u in unit.player.units if u.hp > 0]
+    opp_units = [u for u in unit.player.opp.units if u.hp > 0]
     winning = len(own_units) > len(opp_units)
 
     detonate_score = 0
@@ -151,14 +156,15 @@ def can_bomb_safely(board, unit):
     # get_bomb_area
     # get safe_paths. 
     # only safe if a cell in safe_paths exists outside of bomb_area
-    blast_cells = board.get_bomb_area(unit.cell, diameter=unit.diameter)
-    own_units = [u for u in unit.player.units if u.hp > 0 and u.cell in blast_cells]
+    blast_bits = board.get_bomb_area_bits(unit.cell, diameter=unit.diameter)
+    unsafe_bits = blast_bits | board.future_fire_bits()
+    own_units = [u for u in unit.player.units if u.hp > 0 and u.cell.bit & blast_bits]
     safe_units = set()
     assert unit in own_units
     for own_unit in own_units:
         for dist in range(1, len(own_unit.cell.safe_paths)):
             for cell in own_unit.cell.safe_paths[dist]:
-                if not cell.future_fire_start and not cell in blast_cells:
+                if not cell.bit & unsafe_bits:
                     safe_units.add(own_unit)
                     break
     return len(safe_units) == len(own_units)
@@ -186,9 +192,8 @@ def can_bomb_for_stunned_opp(board, unit):
         return False
     if not can_bomb_safely(board, unit):
         return False
-    opp_id = 'a' if unit.player.id == 'b' else 'b'
     opp_stun_cells = []
-    for opp_unit in board.players[opp_id].units:
+    for opp_unit in unit.player.opp.units:
         if (opp_unit.hp > 0  # not dead
             and opp_unit.stunned >= board.tick + 1 + 5):  # still stunned when bomb can go off
             if not is_stunned_opp_already_threatened(board, unit, opp_unit.cell):
@@ -214,9 +219,8 @@ def can_bomb_for_instant_damage(board, unit):
     return False
 
 def check_for_stun_attack_goal(board, unit):
-    opp_id = 'a' if unit.player.id == 'b' else 'b'
     opp_stun_cells = []
-    for opp_unit in board.players[opp_id].units:
+    for opp_unit in unit.player.opp.units:
         if (opp_unit.hp > 0  # not dead
             and opp_unit.stunned >= board.tick + 1 + 5):  # still stunned when bomb can go off
             if not is_stunned_opp_already_threatened(board, unit, opp_unit.cell):
@@ -243,32 +247,40 @@ def check_for_stun_attack_goal(board, unit):
     #for cell in board.cells:
     #    target_range_i = min(len(cell.target_range) - 1, ((unit.diameter // 2) - 1))
     #    target_range = cell.target_range[target_range_i]
-    #    target_range = target_range if (unit.player.id == 'a') else -target_range
+    #    target_range = target_range if (unit.player.idx == 0) else -target_range
     #    if target_range > 10:  # stun attacks are 20
     #        blast_cells = board.get_bomb_area(cell, diameter=unit.diameter)
     #        for opp_stun_cell in opp_stun_cells:
-    #            safe_dist = cell.safe_dists[unit.id][0]
+    #            safe_dist = cell.safe_dists[unit.idx][0]
     #            if opp_stun_cell.unit.stunned >= board.tick + 1 + 5 + safe_dist:
     #                if goal_is_safe(board, unit, cell):
     #                    return cell
 
+    # Only cells the unit can reach while some opp is still stunned, safe_dist is at least the static dist
+    max_safe_dist = min(25, max(opp_unit.stunned for opp_unit in unit.player.opp.units if opp_unit.hp > 0) - (board.tick + 1 + 5))
+    reachable_bits = board.topology.static_bits(unit.cell.pos, max_safe_dist)
+
+    opp_unit_bits = board.unit_bits[unit.player.opp.idx]
     possible_goals = []
-    for cell in board.cells:
+    for cell in board.cells_from_bits(reachable_bits):
         #if (cell.wall or cell.box or cell.bomb_diameter
         #    or (cell.unit and cell.unit.hp <= 0)
         #    or (cell.unit and cell.unit.player.id != unit.player.id)):
         #    continue
 
-        safe_dist = cell.safe_dists[unit.id][0]
+        safe_dist = cell.safe_dists[unit.idx][0]
         if safe_dist > 25: # stun duration - bomb place/priming
             continue
 
+        blast_bits = board.get_bomb_area_bits(cell, diameter=unit.diameter)
+        if not blast_bits & opp_unit_bits:
+            continue
+
         own_max, opp_max = 0, 0
         opp_count = 0
-        blast_cells = board.get_bomb_area(cell, diameter=unit.diameter)
-        for blast_cell in blast_cells:
+        for blast_cell in board.cells_from_bits(blast_bits):
             if blast_cell.unit and blast_cell.unit.stunned >= board.tick + 1 + 5 + safe_dist:
-                if blast_cell.unit.player.id == unit.player.id:
+                if blast_cell.unit.player is unit.player:
                     own_max = max(own_max, blast_cell.unit.stunned)
                 else:
                     opp_max = max(opp_max, blast_cell.unit.stunned)
@@ -286,17 +298,17 @@ def check_for_stun_attack_goal(board, unit):
 def check_for_freeze_powerup_goal(board, unit):
     for cell in board.cells:
         if cell.freeze_powerup and not cell.unit:
-            min_unit_id, min_safe_dist = None, UNREACHABLE
-            for unit_id in board.units:
-                if board.units[unit_id].hp <= 0:
+            min_unit, min_safe_dist = None, UNREACHABLE
+            for other_unit in board.units.values():
+                if other_unit.hp <= 0:
                     continue
-                safe_dist = cell.safe_dists[unit_id][0]
+                safe_dist = cell.safe_dists[other_unit.idx][0]
                 if safe_dist < min_safe_dist:
-                    min_unit_id, min_safe_dist = unit_id, safe_dist
-            #print(f'FREEZE: unit {min_unit_id} is {min_safe_dist} ticks away')
+                    min_unit, min_safe_dist = other_unit, safe_dist
+            #print(f'FREEZE: unit {min_unit.id} is {min_safe_dist} ticks away')
             #if unit.player is board.player['b']:
-            #    print(f'unit {unit.id} dist={cell.safe_dists[unit.id][0]}')
-            if board.tick + min_safe_dist < cell.expires and min_unit_id == unit.id:
+            #    print(f'unit {unit.id} dist={cell.safe_dists[unit.idx][0]}')
+            if board.tick + min_safe_dist < cell.expires and min_unit is unit:
                 if goal_is_safe(board, unit, cell):
                     return cell
     return None
@@ -304,39 +316,38 @@ def check_for_freeze_powerup_goal(board, unit):
 def check_for_blast_powerup_goal(board, unit):
     for cell in board.cells:
         if cell.blast_powerup and not cell.unit:
-            min_unit_id, min_safe_dist = None, UNREACHABLE
-            for unit_id in board.units:
-                if board.units[unit_id].hp <= 0:
+            min_unit, min_safe_dist = None, UNREACHABLE
+            for other_unit in board.units.values():
+                if other_unit.hp <= 0:
                     continue
-                safe_dist = cell.safe_dists[unit_id][0]
+                safe_dist = cell.safe_dists[other_unit.idx][0]
                 if safe_dist < min_safe_dist:
-                    min_unit_id, min_safe_dist = unit_id, safe_dist
-            #print(f'BLAST: unit {min_unit_id} is {min_safe_dist} ticks away')
-            if board.tick + min_safe_dist < cell.expires and min_unit_id == unit.id:
+                    min_unit, min_safe_dist = other_unit, safe_dist
+            #print(f'BLAST: unit {min_unit.id} is {min_safe_dist} ticks away')
+            if board.tick + min_safe_dist < cell.expires and min_unit is unit:
                 if goal_is_safe(board, unit, cell):
                     return cell
     return None
 
 def check_for_detonation_safety_goal(board, unit):
-    if unit.bombs and unit.player.id in unit.cell.future_fire_start:
+    if unit.bombs and unit.cell.future_fire_start[unit.player.idx] is not None:
         for dist in range(len(unit.cell.safe_paths) - 1, 0, -1):
             for cell in unit.cell.safe_paths[dist]:
-                if not cell.future_fire_start:
+                if not cell.has_future_fire():
                     return cell
         #for dist in range(1, len(unit.cell.safe_paths)):
         #    for cell in unit.cell.safe_paths[dist]:
-        #        if not unit.player.id in cell.future_fire_start: # Safely navigate to opp-bomb territory as fallback?
+        #        if cell.future_fire_start[unit.player.idx] is None: # Safely navigate to opp-bomb territory as fallback?
         #            return cell
 
 def check_for_detonation_waiting_goal(board, unit):
-    if unit.bombs and not unit.cell.future_fire_start: # Stay where you are if bomb placed and currently safe
+    if unit.bombs and not unit.cell.has_future_fire(): # Stay where you are if bomb placed and currently safe
         return unit.cell
 
 def check_for_choke_point_goal(board, unit):
-    opp_id = 'a' if unit.player.id == 'b' else 'b'
-
     choke_points = []
-    for opp_unit in board.players[opp_id].units:
+    cut_index = board.get_cut_index()
+    for opp_unit in unit.player.opp.units:
         if opp_unit.hp <= 0:
             continue
 
@@ -344,16 +355,21 @@ def check_for_choke_point_goal(board, unit):
         if len(opp_unit.cell.safe_paths[-1]) <= 1:
             continue
 
-        # Identify choke points for opp_unit
-        for i in range(1, len(opp_unit.cell.safe_paths)):
-            if len(opp_unit.cell.safe_paths[i]) == 1:
-                for j in range(i + 1, len(opp_unit.cell.safe_paths)):
-                    if len(opp_unit.cell.safe_paths[i]) > 1:
-                        choke_points.append((opp_unit.cell.safe_paths[i][0], i))
-
-    for choke_cell, opp_dist in choke_points:
-        if choke_cell.safe_dists[unit.id][0] <= opp_dist:
-            if goal_is_safe(board, unit, chok_cell):
+        # Choke points for opp_unit: cells whose occupation cuts it off from at least half of its safe cells
+        safe_bits = 0
+        for safe_cells in opp_unit.cell.safe_paths[1:]:
+            for safe_cell in safe_cells:
+                safe_bits |= safe_cell.bit
+        min_cut = max(1, (popcount(safe_bits) + 1) // 2)
+        for choke_cell, num_cut in cut_index.cut_cells(opp_unit.cell, safe_bits, min_count=min_cut):
+            opp_dist = choke_cell.safe_dists[opp_unit.idx][0]
+            if opp_dist < UNREACHABLE:
+                choke_points.append((choke_cell, opp_dist, num_cut))
+
+    choke_points.sort(key=lambda choke_point: -choke_point[2]) # Most safe cells cut off first
+    for choke_cell, opp_dist, _ in choke_points:
+        if choke_cell.safe_dists[unit.idx][0] <= opp_dist:
+            if goal_is_safe(board, unit, choke_cell):
                 return choke_cell
     return None
 
@@ -366,29 +382,29 @@ def can_bomb_for_opp_disruption(board, unit):
     if not can_bomb_safely(board, unit):
         return False
 
-    blast_cells = board.get_bomb_area(unit.cell, diameter=unit.diameter)
-    opp_id = 'a' if unit.player.id == 'b' else 'b'
-    opp_units = [u for u in board.players[opp_id].units if u.hp > 0]
+    blast_bits = board.get_bomb_area_bits(unit.cell, diameter=unit.diameter)
+    future_fire_bits = board.future_fire_bits()
+    opp_units = [u for u in unit.player.opp.units if u.hp > 0]
+    safe_regions = board.get_safe_regions()
 
     for opp_unit in opp_units:
-        safe_cell_set1, safe_cell_set2 = set(), set()
-        truly_safe_cell_set1, truly_safe_cell_set2 = set(), set()
+        if (not opp_unit.cell.eog_fire # Its safe paths may cross end-of-game fire, leaving the region
+            and any(opp_unit.cell.safe_paths[1:]) # Having no safe cells counts as disrupted below
+            and not safe_regions.bits(opp_unit.cell) & blast_bits):
+            continue # The blast takes no room from opp_unit's safe paths, which stay in its region
+        safe_bits1, safe_bits2 = 0, 0
         max_safe_dist1, max_safe_dist2 = 0, 0
         for dist in range(1, len(opp_unit.cell.safe_paths)):
             safe_cells = opp_unit.cell.safe_paths[dist]
             for safe_cell in safe_cells:
                 max_safe_dist1 = dist
-                safe_cell_set1.add(safe_cell)
-                if not safe_cell.future_fire_start:
-                    truly_safe_cell_set1.add(safe_cell)
-                if not safe_cell in blast_cells: # If the safe cell is unaffected 
+                safe_bits1 |= safe_cell.bit
+                if not safe_cell.bit & blast_bits: # If the safe cell is unaffected
                     max_safe_dist2 = dist
-                    safe_cell_set2.add(safe_cell)
-                    if not safe_cell.future_fire_start:
-                        truly_safe_cell_set2.add(safe_cell)
+                    safe_bits2 |= safe_cell.bit
         if (max_safe_dist2 <= max_safe_dist1 / 2
-            or len(safe_cell_set2) <= len(safe_cell_set1) / 2
-            or len(truly_safe_cell_set2) <= len(truly_safe_cell_set1) / 2):
+            or popcount(safe_bits2) <= popcount(safe_bits1) / 2
+            or popcount(safe_bits2 & ~future_fire_bits) <= popcount(safe_bits1 & ~future_fire_bits) / 2):
             return True
     return False
 
@@ -423,13 +439,13 @@ def check_for_mining_goal(board, unit):
     #t = time.time()
     possible_goals = []
     for cell in board.cells:
-        if cell.bomb_diameter or cell.wall or unit.player.id in cell.future_fire_start:
+        if cell.bomb_diameter or cell.wall or cell.future_fire_start[unit.player.idx] is not None:
             continue
         target_range_i = min(len(cell.target_range) - 1, ((unit.diameter // 2) - 1))
         target_range = cell.target_range[target_range_i]
-        target_range = target_range if (unit.player.id == 'a') else -target_range
+        target_range = target_range if (unit.player.idx == 0) else -target_range
         if target_range >= target_range_lim:  # at least 2 ore boxes typically
-            safe_dist = cell.safe_dists[unit.id][0]
+            safe_dist = cell.safe_dists[unit.idx][0]
             if safe_dist != UNREACHABLE:
                 possible_goals.append((cell, safe_dist, target_range))
     if possible_goals:
@@ -444,7 +460,7 @@ def check_for_mining_goal(board, unit):
 def check_for_any_safe_goal(board, unit):
     for dist in range(len(unit.cell.safe_paths) - 1, 0, -1): # backwards, don't check dist==0
         for safe_cell in unit.cell.safe_paths[dist]:
-            if not safe_cell.future_fire_start:
+            if not safe_cell.has_future_fire():
                 return safe_cell # Return furthest truly safe destination
     for dist in range(len(unit.cell.safe_paths) - 1, 0, -1): # backwards, don't check dist==0
         for safe_cell in unit.cell.safe_paths[dist]:
@@ -470,7 +486,7 @@ async def do_move(board, unit, dest_cell):
 
     cell = dest_cell
     while cell:
-        prev_cell = cell.safe_dists[unit.id][1]
+        prev_cell = cell.safe_dists[unit.idx][1]
         if prev_cell is unit.cell:
             break
         cell = prev_cell
@@ -502,6 +518,7 @@ async def do_move(board, unit, dest_cell):
     }
     action = ACTIONS[move_cell]
     move_cell.unit_next = unit
+    board._invalidate(move_cell.bit)
     print(f'unit {unit.id} do_move tick{board.tick} {dest_cell.x},{dest_cell.y} via {move_cell.x},{move_cell.y} ({action})')
     if action:
         await board._client.send_move(action, unit.id)
@@ -509,73 +526,76 @@ async def do_move(board, unit, dest_cell):
         #start_time = time.time()
         #if (board.tick < 200 and 1000 * (time.time() - board.tick_start) < 60):
         #or (board.tick >= 200 and 1000 * (time.time() - board.tick_start) < 40)):
-        if (1000 * (time.time() - board.tick_start) < 60):
-            board._update_dists()
-            board._update_target_range() # need dists first
+    board._update_dists(changed_bits=move_cell.bit) # Only move_cell.unit_next changed, stays reserve too
+    board._update_target_range() # need dists first
 
 async def do_bomb(board, unit):
     # Update future_fire_start for unit's player
-    blast_cells = board.get_bomb_area(unit.cell, diameter=unit.diameter)
-    for blast_cell in blast_cells:
-        if not unit.player.id in blast_cell.future_fire_start:
-            blast_cell.future_fire_start[unit.player.id] = board.tick + 1 + 5
-            blast_cell.future_fire_end[unit.player.id] = board.tick + 1 + 30 + 5
+    blast_bits = board.get_bomb_area_bits(unit.cell, diameter=unit.diameter)
+    player_idx = unit.player.idx
+    board.future_fire_start_bits[player_idx] |= blast_bits
+    for blast_cell in board.cells_from_bits(blast_bits):
+        if blast_cell.future_fire_start[player_idx] is None:
+            blast_cell.future_fire_start[player_idx] = board.tick + 1 + 5
+            blast_cell.future_fire_end[player_idx] = board.tick + 1 + 30 + 5
         else:
-            blast_cell.future_fire_start[unit.player.id] = (
-                min(board.tick + 1 + 5, blast_cell.future_fire_start[unit.player.id]))
-            blast_cell.future_fire_end[unit.player.id] = (
-                min(board.tick + 1 + 30 + 5, blast_cell.future_fire_end[unit.player.id]))
+            blast_cell.future_fire_start[player_idx] = (
+                min(board.tick + 1 + 5, blast_cell.future_fire_start[player_idx]))
+            blast_cell.future_fire_end[player_idx] = (
+                min(board.tick + 1 + 30 + 5, blast_cell.future_fire_end[player_idx]))
+    board._update_danger(blast_bits)
     unit.bombs.append(unit.cell)
     unit.player.bombs.append(unit.cell)
     unit.cell.bomb_diameter = unit.diameter
     unit.cell.bomb_unit = unit
+    board.bomb_bits |= unit.cell.bit
+    board._drop_bomb_areas(unit.cell.bit)
+    board._invalidate(blast_bits)
     print(f'unit {unit.id} do_bomb tick{board.tick} {unit.cell.x},{unit.cell.y}')
     await board._client.send_bomb(unit.id)
     #asyncio.ensure_future(board._client.send_bomb(unit.id))
     #if (board.tick < 200 and 1000 * (time.time() - board.tick_start) < 60):
     #or (board.tick >= 200 and 1000 * (time.time() - board.tick_start) < 40)):
-    if (1000 * (time.time() - board.tick_start) < 60):
-        board._update_dists()
-        board._update_target_range() # need dists first
+    board._update_dists(changed_bits=blast_bits) # New bomb and future fire
+    board._update_target_range() # need dists first
 
 async def do_detonate(board, unit, bomb_cell):
     # TODO get blast_cells and set future_fire for board.player.id
     #blast_cells = board.get_bomb_area(unit.cell, unit.diameter)
-    blast_cells = board.get_bomb_area(bomb_cell)
-    for blast_cell in blast_cells:
-        if not unit.player.id in blast_cell.future_fire_start:
-            blast_cell.future_fire_start[unit.player.id] = board.tick + 1
-            blast_cell.future_fire_end[unit.player.id] = board.tick + 1 + 5
+    blast_bits = board.get_bomb_area_bits(bomb_cell)
+    player_idx = unit.player.idx
+    board.future_fire_start_bits[player_idx] |= blast_bits
+    for blast_cell in board.cells_from_bits(blast_bits):
+        if blast_cell.future_fire_start[player_idx] is None:
+            blast_cell.future_fire_start[player_idx] = board.tick + 1
+            blast_cell.future_fire_end[player_idx] = board.tick + 1 + 5
         else:
-            blast_cell.future_fire_start[unit.player.id] = (
-                min(board.tick + 1 + 5, blast_cell.future_fire_start[unit.player.id]))
-            blast_cell.future_fire_end[unit.player.id] = (
-                min(board.tick + 1 + 5, blast_cell.future_fire_end[unit.player.id]))
+            blast_cell.future_fire_start[player_idx] = (
+                min(board.tick + 1 + 5, blast_cell.future_fire_start[player_idx]))
+            blast_cell.future_fire_end[player_idx] = (
+                min(board.tick + 1 + 5, blast_cell.future_fire_end[player_idx]))
+    board._update_danger(blast_bits)
     unit.bombs.remove(bomb_cell)
     unit.player.bombs.remove(bomb_cell)
     bomb_cell.bomb_diameter = None
     bomb_cell.bomb_unit = None
+    board.bomb_bits &= ~bomb_cell.bit
+    board._drop_bomb_areas(bomb_cell.bit)
+    board._invalidate(blast_bits)
     print(f'unit {unit.id} do_detonate tick{board.tick} {bomb_cell.x},{bomb_cell.y}')
     await board._client.send_detonate(bomb_cell.x, bomb_cell.y, unit.id)
     #asyncio.ensure_future(board._client.send_detonate(bomb_cell.x, bomb_cell.y, unit.id))
     #if (board.tick < 200 and 1000 * (time.time() - board.tick_start) < 60):
     #or (board.tick >= 200 and 1000 * (time.time() - board.tick_start) < 40)):
-    if (1000 * (time.time() - board.tick_start) < 60):
-        board._update_dists()
-        board._update_target_range() # need dists first
+    board._update_dists(changed_bits=blast_bits) # Detonated bomb and future fire
+    board._update_target_range() # need dists first
 
 async def act(board, units): # TODORMA
     start_time = time.time()
     #print('A', 0, round((time.time() - start_time) * 1000))
     
     # TODO goal of move to center if near outside late in game (after 200)
-    for player in board.players.values():
-        player.save_bombs = list(player.bombs)
-    for unit in board.units.values():
-        unit.save_bombs = list(unit.bombs)
-    for cell in board.cells:
-        cell.save_bomb_diameter = cell.bomb_diameter
-        cell.save_bomb_unit = cell.bomb_unit
+    board.save_bombs()
 
     units_done = []
 
@@ -716,19 +736,13 @@ async def act(board, units): # TODORMA
     assert len(units) == len(units_done)
 
     # Restore original board settings after all units have been processed
-    for player in board.players.values():
-        player.bombs = list(player.save_bombs)
-    for unit in board.units.values():
-        unit.bombs = list(unit.save_bombs)
-    for cell in board.cells:
-        cell.bomb_diameter = cell.save_bomb_diameter
-        cell.bomb_unit = cell.save_bomb_unit
+    board.restore_bombs()
     #print('Q', len(units_done), round((time.time() - start_time) * 1000))
 
 
 class Agent():
     def __init__(self):
-        self._client = GameState(uri)
+        self._client = GameState(uri, backend=backend, target_ranges=target_ranges, verify=verify, seed=seed)
         self._client.set_game_tick_callback(self._on_game_tick)
         loop = asyncio.get_event_loop()
         connection = loop.run_until_complete(self._client.connect())
@@ -0,0 +1,166 @@
+'''
+Replay ../replay.json through GameState and time the tick handling.
+
+  python bench.py                      # bucket vs heap search queue
+  python bench.py --agent              # include the agent's actions in each tick
+  python bench.py --queue heap --repeat 10
+  python bench.py --backend numpy --queue bucket --target-ranges incremental numpy
+  python bench.py --queue bucket --tick-state changed full
+  python bench.py --agent --in-tick repair full
+
+Each configuration is replayed --repeat times (interleaved, same board --seed)
+and the fastest run is reported, along with its mean on quiet ticks (units only
+moved) and its time in Board._update_target_range. --tick-state full redoes every
+stage of Board._update_tick_state on every tick instead of only the changed ones.
+With --agent, the time the agent's actions spend bringing the searches up to date
+is reported too; --in-tick full redoes every unit's searches after each action
+instead of repairing them around the cells the action changed.
+'''
+
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import os
+import time
+
+from game_state import Board, GameState
+
+
+REPLAY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'replay.json')
+
+
+class ReplayGameState(GameState):
+    '''GameState fed from a replay instead of a connection, actions are dropped'''
+    async def _send(self, packet):
+        pass
+
+
+def load_replay(path):
+    with open(path) as f:
+        payload = json.load(f)['payload']
+    initial_state = payload['initial_state']
+    initial_state.setdefault('connection', {'agent_id': 'a'})
+    return initial_state, payload['history']
+
+
+@contextlib.contextmanager
+def timed_target_ranges(stage_times):
+    '''Appends the time of each Board._update_target_range call to stage_times'''
+    update_target_range = Board._update_target_range
+    def timed(self):
+        start = time.perf_counter()
+        update_target_range(self)
+        stage_times.append(time.perf_counter() - start)
+    Board._update_target_range = timed
+    try:
+        yield
+    finally:
+        Board._update_target_range = update_target_range
+
+
+@contextlib.contextmanager
+def tick_state(mode):
+    '''Makes Board._update_tick_state redo every stage if mode is full'''
+    update_tick_state = Board._update_tick_state
+    if mode == 'full':
+        Board._update_tick_state = lambda self, full=False: update_tick_state(self, full=True)
+    try:
+        yield
+    finally:
+        Board._update_tick_state = update_tick_state
+
+
+@contextlib.contextmanager
+def in_tick(mode, in_tick_times):
+    '''Appends the time of each in-tick Board._update_dists(changed_bits) call to in_tick_times,
+    doing a full recompute instead of the repair if mode is full'''
+    update_dists = Board._update_dists
+    def timed(self, changed_bits=None):
+        if changed_bits is None:
+            return update_dists(self)
+        start = time.perf_counter()
+        if mode == 'full':
+            self.changes.add(changed_bits)
+            update_dists(self)
+        else:
+            update_dists(self, changed_bits)
+        in_tick_times.append(time.perf_counter() - start)
+    Board._update_dists = timed
+    try:
+        yield
+    finally:
+        Board._update_dists = update_dists
+
+
+def is_quiet(game_tick):
+    return all(event['type'] == 'unit' for event in game_tick['events'])
+
+
+async def replay(initial_state, history, with_agent, mode, in_tick_mode='repair', **kwargs):
+    client = ReplayGameState('', **kwargs)
+    if with_agent:
+        import agent
+        async def on_game_tick(board):
+            for cell in board.cells:
+                cell.unit_next = None
+            units = [u for u in board.player.units if u.hp > 0 and u.stunned < board.tick]
+            board.start_time = time.time()
+            await agent.act(board, units)
+        client.set_game_tick_callback(on_game_tick)
+
+    times = []
+    target_range_times = []
+    in_tick_times = []
+    with contextlib.redirect_stdout(io.StringIO()), timed_target_ranges(target_range_times), tick_state(mode), \
+         in_tick(in_tick_mode, in_tick_times):
+        client._on_game_state(json.loads(json.dumps(initial_state)))
+        for game_tick in history:
+            start = time.perf_counter()
+            await client._on_game_tick(game_tick)
+            times.append(time.perf_counter() - start)
+    return times, target_range_times, in_tick_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--replay', default=REPLAY)
+    parser.add_argument('--queue', nargs='+', default=['bucket', 'heap'], choices=['bucket', 'heap'])
+    parser.add_argument('--backend', default='python', choices=['python', 'numpy'])
+    parser.add_argument('--target-ranges', nargs='+', default=['incremental'], choices=['incremental', 'numpy'],
+                        help='numpy needs --backend numpy')
+    parser.add_argument('--tick-state', nargs='+', default=['changed'], choices=['changed', 'full'])
+    parser.add_argument('--agent', action='store_true', help='run agent.act on every tick')
+    parser.add_argument('--in-tick', nargs='+', default=['repair'], choices=['repair', 'full'],
+                        help='how the agent\'s actions update the searches')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    initial_state, history = load_replay(args.replay)
+    quiet = [is_quiet(game_tick) for game_tick in history]
+    best = {}
+    for _ in range(args.repeat):
+        for config in itertools.product(args.queue, args.target_ranges, args.tick_state, args.in_tick):
+            queue, target_ranges, mode, in_tick_mode = config
+            times, target_range_times, in_tick_times = asyncio.run(replay(
+                initial_state, history, args.agent, mode, in_tick_mode, backend=args.backend, queue=queue,
+                target_ranges=target_ranges, seed=args.seed))
+            if config not in best or sum(times) < sum(best[config][0]):
+                best[config] = times, target_range_times, in_tick_times
+
+    print(f'{len(history)} ticks ({sum(quiet)} quiet), backend={args.backend}, agent={args.agent}, best of {args.repeat}')
+    for (queue, target_ranges, mode, in_tick_mode), (times, target_range_times, in_tick_times) in best.items():
+        quiet_times = [t for t, is_quiet_tick in zip(times, quiet) if is_quiet_tick]
+        in_tick_desc = (f'  in_tick={in_tick_mode} {1000 * sum(in_tick_times):6.1f}ms / {len(in_tick_times)} actions'
+                        if args.agent else '')
+        print(f'  queue={queue:<8} target_ranges={target_ranges:<12} tick_state={mode:<8} '
+              f'total {1000 * sum(times):7.1f}ms  mean {1000 * sum(times) / len(times):6.2f}ms  '
+              f'quiet {1000 * sum(quiet_times) / max(len(quiet_times), 1):6.2f}ms  max {1000 * max(times):6.1f}ms  '
+              f'target_range {1000 * sum(target_range_times):6.1f}ms / {len(target_range_times)} calls{in_tick_desc}')
+
+
+if __name__ == '__main__':
+    main()
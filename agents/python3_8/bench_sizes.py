@@ -0,0 +1,125 @@
+'''
+Time the tick handling on larger maps, tiling the map of ../replay.json.
+
+  python bench_sizes.py                       # 15x15, 30x30 and 60x60
+  python bench_sizes.py --sizes 15 45 --agent  # include the agent's actions in each tick
+
+The replay's walls, boxes and powerups are repeated over a SIZE x SIZE board and its
+events are replayed in the original corner until end-of-game fire starts (the spirals
+differ on larger boards). Each size is replayed --repeat times (interleaved, same board
+--seed) and the fastest run is reported, split into the Board stages below, with how
+much longer the mean tick got than on the previous size: on a board with k times the
+cells, anything beyond x k is a super-linear cost.
+'''
+
+import argparse
+import asyncio
+import contextlib
+import copy
+import io
+import time
+
+from bench import REPLAY, is_quiet, load_replay, replay
+from game_state import Board
+
+
+TILE = 15 # Width and height of the replay's map
+STAGES = ('_update_future_fire', '_update_danger', '_update_dists', '_update_dists_since', '_update_target_range')
+
+
+def scale_initial_state(initial_state, size):
+    '''initial_state on a size x size board, its entities repeated in TILE x TILE tiles'''
+    initial_state = copy.deepcopy(initial_state)
+    initial_state['world'] = {'width': size, 'height': size}
+    entities = []
+    for tile_y in range(0, size, TILE):
+        for tile_x in range(0, size, TILE):
+            for entity in initial_state['entities']:
+                x, y = entity['x'] + tile_x, entity['y'] + tile_y
+                if x < size and y < size:
+                    entities.append(dict(entity, x=x, y=y))
+    initial_state['entities'] = entities
+    return initial_state
+
+
+def before_eog_fire(history):
+    '''The ticks of history before the first end-of-game fire spawns'''
+    for i, game_tick in enumerate(history):
+        for event in game_tick['events']:
+            if event['type'] == 'entity_spawned' and event['data']['type'] == 'x' and 'expires' not in event['data']:
+                return history[:i]
+    return history
+
+
+@contextlib.contextmanager
+def timed_stages(stage_times):
+    '''Adds the time spent in each of the STAGES Board methods to stage_times'''
+    originals = {name: getattr(Board, name) for name in STAGES}
+    def timed(name, method):
+        def wrapper(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                stage_times[name] += time.perf_counter() - start
+        return wrapper
+    for name, method in originals.items():
+        setattr(Board, name, timed(name, method))
+    try:
+        yield
+    finally:
+        for name, method in originals.items():
+            setattr(Board, name, method)
+
+
+def time_board_init(initial_state, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        Board(initial_state, **kwargs)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--replay', default=REPLAY)
+    parser.add_argument('--sizes', nargs='+', type=int, default=[15, 30, 60])
+    parser.add_argument('--queue', default='bucket', choices=['bucket', 'heap'])
+    parser.add_argument('--backend', default='python', choices=['python', 'numpy'])
+    parser.add_argument('--agent', action='store_true', help='run agent.act on every tick')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    initial_state, history = load_replay(args.replay)
+    history = before_eog_fire(history)
+    quiet = [is_quiet(game_tick) for game_tick in history]
+    kwargs = dict(backend=args.backend, queue=args.queue, seed=args.seed)
+    initial_states = {size: scale_initial_state(initial_state, size) for size in args.sizes}
+    best = {}
+    for _ in range(args.repeat):
+        for size in args.sizes:
+            stage_times = dict.fromkeys(STAGES, 0)
+            with timed_stages(stage_times):
+                times, _, _ = asyncio.run(replay(initial_states[size], history, args.agent, 'changed', **kwargs))
+            init_time = time_board_init(initial_states[size], **kwargs)
+            if size not in best or sum(times) < sum(best[size][0]):
+                best[size] = times, stage_times, init_time
+
+    print(f'{len(history)} ticks ({sum(quiet)} quiet), backend={args.backend}, queue={args.queue}, '
+          f'agent={args.agent}, best of {args.repeat}')
+    prev = None
+    for size, (times, stage_times, init_time) in best.items():
+        mean = sum(times) / len(times)
+        quiet_times = [t for t, is_quiet_tick in zip(times, quiet) if is_quiet_tick]
+        growth = '' if prev is None else f'  x{mean / prev[1]:.1f} for x{size * size / prev[0]:.1f} cells'
+        print(f'  {size}x{size:<4} init {1000 * init_time:7.1f}ms  total {1000 * sum(times):8.1f}ms  '
+              f'mean {1000 * mean:7.2f}ms  quiet {1000 * sum(quiet_times) / max(len(quiet_times), 1):7.2f}ms  '
+              f'max {1000 * max(times):7.1f}ms{growth}')
+        other = sum(times) - sum(stage_times.values())
+        stages = '  '.join(f'{name.lstrip("_")} {1000 * stage_time:.1f}ms' for name, stage_time in stage_times.items())
+        print(f'      {stages}  other {1000 * other:.1f}ms')
+        prev = size * size, mean
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,7 @@
 import asyncio
+import bisect
 import heapq
+import itertools
 import json
 import random
 import time
@@ -7,22 +9,61 @@ import websockets
 
 from websockets.client import WebSocketClientProtocol
 
+try:
+    import numpy as np
+except ImportError: # numpy backend is optional
+    np = None
+
 
-SIZE = 15
-SIZE2 = SIZE * SIZE
 UNREACHABLE = 10000000
+NONE = -1 # Stands in for None in BoardArrays
+
+PLAYER_IDS = ['a', 'b']
+UNIT_IDS = ['c', 'd', 'e', 'f', 'g', 'h']
+NUM_PLAYERS = len(PLAYER_IDS)
+NUM_UNITS = len(UNIT_IDS)
+OPPONENT = [1, 0] # player idx -> opponent player idx
+TEMP = NUM_UNITS # Scratch slot in Board.safe_dists for one-off searches
+UNREACHED = (UNREACHABLE, None)
+NO_FUTURE_FIRE = [None] * NUM_PLAYERS
+SAFE_PATHS_LEN = 6 + 1 # safe_at_dist buckets for dists 0-6 (longer than invuln and bomb priming)
+HORIZON = 48 # Ticks covered by DangerGrid.next_safe, later arrivals fall back to its ranges
+TARGET_RANGE_LEN = 10 # Cell.target_range buckets for ranges 1-10
+EOG_LOOKAHEAD = 35 # End-of-game fire is predicted for spawns less than this many ticks after a spiral's latest
+NEIGHBOR_ORDERS = list(itertools.permutations(range(4))) # Orders of Topology.adjacent, see Board.neighbor_order
+MOVE_ORDERS = list(itertools.permutations(range(5))) # Orders of Topology.adjacent_and_self
+ZOBRIST_MASK = (1 << 64) - 1
+ZOBRIST_UNIT, ZOBRIST_WALL, ZOBRIST_BOX, ZOBRIST_BOMB, ZOBRIST_FIRE, ZOBRIST_BLAST_POWERUP, ZOBRIST_FREEZE_POWERUP = range(7)
+
+
+def popcount(bits):
+    return bin(bits).count('1')
+
+
+def zobrist_key(*values):
+    '''64-bit Zobrist key for a tuple of ints, splitmix64 of its hash so it is the same in every run'''
+    x = (hash(values) + 0x9E3779B97F4A7C15) & ZOBRIST_MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & ZOBRIST_MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & ZOBRIST_MASK
+    return x ^ (x >> 31)
 
 
 class Cell:
+    __slots__ = ('board', 'x', 'y', 'pos', 'bit', 'west', 'north', 'east', 'south', 'safe_dists',
+                 'safe_paths', 'target_range', 'unit', 'hp', 'wall', 'box', 'created', 'expires',
+                 'bomb_diameter', 'bomb_unit', 'fire', 'blast_powerup', 'freeze_powerup',
+                 'future_fire_start', 'future_fire_end', 'eog_fire', 'next_eog', 'unit_next')
+
     def __init__(self, board, position):
         self.board = board
-        self.x = position % SIZE
-        self.y = position // SIZE
+        self.x = position % board.width
+        self.y = position // board.width
+        self.pos = position
+        self.bit = 1 << position # This cell's bit in Board bitboards
         self.west, self.north, self.east, self.south = None, None, None, None
-        self.dists = {} # {unit_id: (dist, prev_cell)}
-        self.safe_dists = {} # {unit_id: (dist, prev_cell)}
+        self.safe_dists = CellDists(board.safe_dists, position) # [unit_idx]: (dist, prev_cell)
         self.safe_paths = None
-        self.target_range = [0] * 10 # number of targets within range 1, 2, 3, 4...
+        self.target_range = [0] * TARGET_RANGE_LEN # number of targets within range 1, 2, 3, 4...
         self.unit = None
         self.hp = 0
         self.wall = False # Only true for indestructible walls
@@ -34,16 +75,21 @@ class Cell:
         self.fire = None # bool
         self.blast_powerup = None
         self.freeze_powerup = None
-        self.future_fire_start = {} # tick that fire may start
-        self.future_fire_end = {} # tick that fire may last until
+        self.future_fire_start = list(NO_FUTURE_FIRE) # [player_idx]: tick that fire may start
+        self.future_fire_end = list(NO_FUTURE_FIRE) # [player_idx]: tick that fire may last until
         self.eog_fire = False
         self.next_eog = None
         self.unit_next = None
 
     def _on_entity_expired(self):
+        self.board.zobrist ^= self._entity_key()
+        if self.bomb_diameter or self.box or self.blast_powerup or self.freeze_powerup:
+            self.board._drop_bomb_areas(self.bit)
         if self.bomb_unit:
             self.bomb_unit.bombs.remove(self)
             self.bomb_unit.player.bombs.remove(self)
+        self.board._clear_bits(self.bit)
+        was_wall = self.wall
         self.hp = 0
         self.wall = False
         self.box = False
@@ -54,51 +100,58 @@ class Cell:
         self.fire = None
         self.blast_powerup = None
         self.freeze_powerup = None
-        self.future_fire_start = {}
-        self.future_fire_end = {}
+        self.future_fire_start = list(NO_FUTURE_FIRE)
+        self.future_fire_end = list(NO_FUTURE_FIRE)
+        if was_wall: # End-of-game fire replaces walls
+            self.board._update_topology()
+
+    def has_future_fire(self):
+        return self.future_fire_start != NO_FUTURE_FIRE
+
+    def _entity_key(self):
+        '''Zobrist key of the cell's entities, see Board.hash'''
+        key = 0
+        if self.wall:
+            key ^= zobrist_key(ZOBRIST_WALL, self.pos)
+        if self.box:
+            key ^= zobrist_key(ZOBRIST_BOX, self.pos, self.hp)
+        if self.bomb_diameter:
+            key ^= zobrist_key(ZOBRIST_BOMB, self.pos, self.bomb_unit.idx, self.bomb_diameter, self.expires)
+        if self.fire:
+            key ^= zobrist_key(ZOBRIST_FIRE, self.pos, self.expires)
+        if self.blast_powerup:
+            key ^= zobrist_key(ZOBRIST_BLAST_POWERUP, self.pos)
+        if self.freeze_powerup:
+            key ^= zobrist_key(ZOBRIST_FREEZE_POWERUP, self.pos)
+        return key
 
     def neighbor(self, dx, dy):
         x, y = self.x + dx, self.y + dy
-        if 0 <= x < SIZE and 0 <= y < SIZE:
+        if 0 <= x < self.board.width and 0 <= y < self.board.height:
             return self.board.cell(x, y)
         return None
 
     def search_neighbors(self, player):
-        cells = random.sample([self.north, self.east, self.south, self.west], 4)
+        board = self.board
+        cells = board.topology.adjacent_orders[self.pos][board.neighbor_order[self.pos]] # Existing, not impenetrable
         return [cell for cell in cells
-                if cell # cell exists
-                and not cell.wall # cell is not impenetrable
                 # TODO opp only impenetrable if same pos and move for 2-3+ turns
-                and not cell.unit_next
+                if not cell.unit_next
                 and not (cell.unit and (cell.unit.hp <= 0 or not cell.unit.player is player))] # No dead/opp unit
 
     def move_neighbors(self):
-        cells = random.sample([self.north, self.east, self.south, self.west, self], 5)
+        adjacent_and_self = self.board.topology.adjacent_and_self[self.pos]
+        cells = [adjacent_and_self[i] for i in MOVE_ORDERS[self.board.move_order[self.pos]]]
         return [cell for cell in cells
-                if cell # cell exists
-                and not cell.wall and not cell.bomb_diameter and not cell.box  # No blocking entity
+                if cell # cell exists and is not a wall
+                and not cell.bomb_diameter and not cell.box  # No blocking entity
                 and not cell.unit_next
                 and not (cell.unit and cell.unit.hp <= 0)] # No dead unit
 
     def safe_turns(self, player, invulnerable):
-        own_id, opp_id = player.id, ('a' if player.id == 'b' else 'b')
-
-        danger_ranges = []
-        if self.fire:
-            danger_ranges.append((self.created, self.expires))
-        if self.future_fire_start:
-            # fire_start = 5
-            #   tick = 2, arrive = 3 (Ok, can leave on 4 safely)
-            #   tick = 3, arrive = 4 (Bad, can't leave in time)
-            #   tick = 4, arrive = 5 (Bad, arrive on fire turn)
-            # fire_end = 10
-            #   tick = 8, arrive = 9 (Bad)
-            #   tick = 9, arrive = 10 (Ok)
-            #   tick = 10, arrive = 11 (Ok)
-            if opp_id in self.future_fire_start:
-                danger_ranges.append((self.future_fire_start[opp_id], self.future_fire_end[opp_id]))
-            if own_id in self.future_fire_end:
-                danger_ranges.append((self.future_fire_end[own_id] - 5, self.future_fire_end[own_id]))
+        danger_ranges = self.board.danger.ranges[player.idx][self.pos]
+        if danger_ranges is None:
+            return UNREACHABLE - self.board.tick - 1
 
         min_danger_start = UNREACHABLE
         for danger_start, safe_begin in danger_ranges:
@@ -111,8 +164,6 @@ class Cell:
 
     def is_safe(self, player, arrival_tick, invulnerable, allow_eog_fire=False):
         '''Returns (bool, int) for is_safe, additional ticks necessary to wait'''
-        own_id, opp_id = player.id, ('a' if player.id == 'b' else 'b')
-
         # If inaccessible
         if (self.wall
             or self.box
@@ -125,63 +176,44 @@ class Cell:
         if not allow_eog_fire and self.eog_fire:
             return False, 0
 
-        # Determine danger range for current/future fire
-        danger_ranges = []
-        if self.fire:
-            danger_ranges.append((self.created, self.expires))
-        if self.future_fire_start:
-            # fire_start = 5
-            #   tick = 2, arrive = 3 (Ok, can leave on 4 safely)
-            #   tick = 3, arrive = 4 (Bad, can't leave in time)
-            #   tick = 4, arrive = 5 (Bad, arrive on fire turn)
-            # fire_end = 10
-            #   tick = 8, arrive = 9 (Bad)
-            #   tick = 9, arrive = 10 (Ok)
-            #   tick = 10, arrive = 11 (Ok)
-            if opp_id in self.future_fire_start:
-                danger_ranges.append((self.future_fire_start[opp_id], self.future_fire_end[opp_id]))
-            if own_id in self.future_fire_end:
-                danger_ranges.append((self.future_fire_end[own_id] - 5, self.future_fire_end[own_id])) # TODO check
-
-        safe_wait = 0
-        safe_wait_adjusted = True
-        while safe_wait_adjusted:
-            safe_wait_adjusted = False
-            for danger_start, safe_begin in danger_ranges:
-                # Vulnerable and need to wait 1 turn
-                if (safe_wait + arrival_tick + 1 == safe_begin  # only need to survive 1 tick (arrival tick)
-                    and invulnerable < safe_wait + arrival_tick):  # vulnerable upon arrival (or earlier)
-                    assert safe_begin - arrival_tick > safe_wait  # should only increase
-                    safe_wait = safe_begin - arrival_tick  # Wait until fire expires (1 turn)
-                    safe_wait_adjusted = True
-                    #print(f'(A) Safe wait {safe_wait} ticks before ({self.x},{self.y}): arrival={arrival_tick}, range={danger_start}..{safe_begin}')
-                    break
-
-                # Vulnerable and need to wait 2+ turns
-                if (danger_start <= safe_wait + arrival_tick + 1 < safe_begin  # Need 2+ ticks at dest (arrive tick and depart tick)
-                    and invulnerable < safe_wait + arrival_tick + 1):  # Vulnerable the turn after arrival (or earlier)
-                    assert safe_begin - arrival_tick > safe_wait
-                    safe_wait = safe_begin - arrival_tick  # Wait until fire expires
-                    safe_wait_adjusted = True
-                    #print(f'(B) Safe wait {safe_wait} ticks before ({self.x},{self.y}): arrival={arrival_tick}, range={danger_start}..{safe_begin}')
-                    break
-
-        # Safe given a certain waiting period (can be 0)
-        return True, safe_wait
+        # Wait until neither the arrival tick nor the departure tick is on fire (see DangerGrid)
+        danger = self.board.danger
+        next_safe = danger.next_safe[player.idx][self.pos]
+        if next_safe is None or arrival_tick < invulnerable:
+            return True, 0
+        if arrival_tick == invulnerable: # Only vulnerable from the departure tick
+            if not danger.is_lethal(player.idx, self.pos, arrival_tick + 1):
+                return True, 0
+            return True, danger.next_safe_tick(player.idx, self.pos, arrival_tick + 1) - arrival_tick
+        offset = arrival_tick - danger.tick
+        if 0 <= offset < HORIZON:
+            return True, next_safe[offset] - arrival_tick
+        return True, danger.next_safe_tick(player.idx, self.pos, arrival_tick) - arrival_tick
 
     def get_safe_paths(self, player, invulnerable, allow_eog_fire=False):
-        '''Returns list of safe dest lists for 1-6tick (longer than invuln and bomb priming) cells'''
-        temp_id = 'temp'
-        for cell in self.board.cells:
-            cell.safe_dists[temp_id] = (UNREACHABLE, None)
-
-        safe_at_dist = [[] for _ in range(6+1)]
-        self.safe_dists[temp_id] = (0, None)
-        queue = [(0, 0, self)]
-        while queue:
-            dist, _, cell = heapq.heappop(queue)
-            if dist >= len(safe_at_dist):
-                continue
+        '''Returns list of safe dest lists for 1-6tick (longer than invuln and bomb priming) cells, memoized'''
+        cache = self.board._safe_paths_cache
+        key = (self.pos, player.idx, invulnerable, allow_eog_fire)
+        cached = cache.get(key)
+        if cached is None:
+            cached = cache[key] = self._search_safe_paths(player, invulnerable, allow_eog_fire)
+        return cached[0]
+
+    def _search_safe_paths(self, player, invulnerable, allow_eog_fire):
+        '''Returns the get_safe_paths result and the bits of the cells it depends on'''
+        neighbor_bits = self.board.topology.neighbor_bits
+        region_bits = 0
+        dists = self.board.safe_dists[TEMP]
+        dists.reset()
+        entries, stamps, generation = dists.entries, dists.stamps, dists.generation
+
+        safe_at_dist = [[] for _ in range(SAFE_PATHS_LEN)]
+        dists[self.pos] = (0, None)
+        queue = self.board.queue_class(0, self)
+        for dist, cell in queue:
+            if dist >= len(safe_at_dist): # Dists only increase from here
+                break
+            region_bits |= cell.bit
 
             safe, safe_wait = True, 0
             if dist > 0:  # Intrinsically "safe" initially in the sense that we can't change the present
@@ -198,7 +230,7 @@ class Cell:
                 # We know that prev_cell is ok at tick + dist - 1
                 #               and cell is ok at tick + dist + safe_wait
                 # Need to confirm tick + dist through tick + dist + safe_wait - 1
-                prev_cell = cell.safe_dists[temp_id][1]
+                prev_cell = entries[cell.pos][1]
                 prev_safe, prev_safe_wait = prev_cell.is_safe(player, self.board.tick + dist + i, invulnerable, allow_eog_fire=allow_eog_fire)
                 if (not prev_safe and not prev_cell is self) or prev_safe_wait != 0:
                     wait_is_ok = False
@@ -208,12 +240,18 @@ class Cell:
 
             safe_at_dist[dist + safe_wait].append(cell)
 
+            region_bits |= neighbor_bits[cell.pos]
             for new_cell in cell.search_neighbors(player):                          
                 new_dist = dist + safe_wait + 1
-                if new_dist < new_cell.safe_dists[temp_id][0]:
-                    new_cell.safe_dists[temp_id] = (new_dist, cell)
-                    heapq.heappush(queue, (new_dist, random.random(), new_cell))
+                pos = new_cell.pos
+                if stamps[pos] != generation or new_dist < entries[pos][0]:
+                    entries[pos], stamps[pos] = (new_dist, cell), generation
+                    queue.push(new_dist, new_cell)
 
+        return self._count_safe_paths(safe_at_dist), region_bits
+
+    def _count_safe_paths(self, safe_at_dist):
+        '''Returns safe_at_dist, number of safe cells, number of truly safe cells, max safe dist'''
         if self.unit:
             safe_paths = safe_at_dist
             print(f'unit {self.unit.id} safe paths:  (inv:{self.unit.invulnerable} stun:{self.unit.stunned})')
@@ -221,35 +259,33 @@ class Cell:
                 s = f'{i} ({len(safe_paths[i])}): '
                 safe_paths[i].sort(key = lambda x: 100 * x.y + x.x)
                 for c in safe_paths[i]:
-                    if not c.future_fire_start:
+                    if not c.has_future_fire():
                         s = s + '*'
                     s = s + f'({c.x},{c.y}), '
                 print(s)
 
-        safe_cell_set = set()
-        truly_safe_cell_set = set()
+        safe_bits = 0
         max_safe_dist = 0
         for dist in range(1, len(safe_at_dist)):
             safe_cells = safe_at_dist[dist]
             for safe_cell in safe_cells:
                 max_safe_dist = dist
-                safe_cell_set.add(safe_cell)
-                if not safe_cell.future_fire_start:
-                    truly_safe_cell_set.add(safe_cell)
+                safe_bits |= safe_cell.bit
+        truly_safe_bits = safe_bits & ~self.board.future_fire_bits()
 
-        return safe_at_dist, len(safe_cell_set), len(truly_safe_cell_set), max_safe_dist
+        return safe_at_dist, popcount(safe_bits), popcount(truly_safe_bits), max_safe_dist
 
     def get_safe_dist(self, other_cell, player, invulnerable, stunned):
-        opp_id = 'a' if player.id == 'b' else 'b'
-        temp_id = 'temp'
-        for cell in self.board.cells:
-            cell.safe_dists[temp_id] = (UNREACHABLE, None)
+        if self.board.topology.static_dists(other_cell.pos)[self.pos] == UNREACHABLE:
+            return UNREACHABLE
+        dists = self.board.safe_dists[TEMP]
+        dists.reset()
+        entries, stamps, generation = dists.entries, dists.stamps, dists.generation
 
         init_dist = max(0, stunned - self.board.tick)
-        self.safe_dists[temp_id] = (0, None)
-        queue = [(init_dist, 0, self)]
-        while queue:
-            dist, _, cell = heapq.heappop(queue)
+        dists[self.pos] = (0, None)
+        queue = self.board.queue_class(init_dist, self)
+        for dist, cell in queue:
 
             safe, safe_wait = True, 0
             if dist > init_dist:  # Intrinsically "safe" initially in the sense that we can't change the present
@@ -263,7 +299,7 @@ class Cell:
                 # We know that prev_cell is ok at tick + dist - 1
                 #               and cell is ok at tick + dist + safe_wait
                 # Need to confirm tick + dist through tick + dist + safe_wait - 1
-                prev_cell = cell.safe_dists[temp_id][1]
+                prev_cell = entries[cell.pos][1]
                 prev_safe, prev_safe_wait = prev_cell.is_safe(player, self.board.tick + dist + i, invulnerable)
                 if (not prev_safe and not prev_cell is self) or prev_safe_wait != 0:
                     wait_is_ok = False
@@ -276,57 +312,118 @@ class Cell:
 
             for new_cell in cell.search_neighbors(player):
                 new_dist = dist + safe_wait + 1
-                if new_dist < new_cell.safe_dists[temp_id][0]:
-                    new_cell.safe_dists[temp_id] = (new_dist, cell)
-                    heapq.heappush(queue, (new_dist, random.random(), new_cell))
+                pos = new_cell.pos
+                if stamps[pos] != generation or new_dist < entries[pos][0]:
+                    entries[pos], stamps[pos] = (new_dist, cell), generation
+                    queue.push(new_dist, new_cell)
         return UNREACHABLE
 
     def get_dist(self, other_cell, player):
-        opp_id = 'a' if player.id == 'b' else 'b'
-        temp_id = 'temp'
-        for cell in self.board.cells:
-            cell.dists[temp_id] = (UNREACHABLE, None)
-
-        self.dists[temp_id] = (0, None)
-        queue = [(0, 0, self)]
-        while queue:
-            dist, _, cell = heapq.heappop(queue)
+        '''A* search, the static distance to other_cell never overestimates what is left'''
+        opp_idx = OPPONENT[player.idx]
+        static_dists = self.board.topology.static_dists(other_cell.pos)
+        if static_dists[self.pos] == UNREACHABLE:
+            return UNREACHABLE
+        dists = self.board.dists
+        dists.reset()
+        entries, stamps, generation = dists.entries, dists.stamps, dists.generation
+
+        dists[self.pos] = (0, None)
+        queue = self.board.queue_class(static_dists[self.pos], self)
+        for estimate, cell in queue:
             if cell is other_cell:
-                return dist
+                return estimate
+            dist = estimate - static_dists[cell.pos]
             for new_cell in cell.search_neighbors(player):
                 new_dist = dist + 1
                 if new_cell.box:
                     new_dist += 14 * new_cell.hp
 
                 arrival_tick = self.board.tick + new_dist
-                if (opp_id in new_cell.future_fire_end
-                    and new_cell.future_fire_start[opp_id] <= arrival_tick + 1 <= new_cell.future_fire_end[opp_id]):
-                    new_dist = new_cell.future_fire_end[opp_id] - self.board.tick
-
-                if new_dist < new_cell.dists[temp_id][0]:
-                    new_cell.dists[temp_id] = (new_dist, cell)
-                    heapq.heappush(queue, (new_dist, random.random(), new_cell))
+                if (new_cell.future_fire_end[opp_idx] is not None
+                    and new_cell.future_fire_start[opp_idx] <= arrival_tick + 1 <= new_cell.future_fire_end[opp_idx]):
+                    new_dist = new_cell.future_fire_end[opp_idx] - self.board.tick
+
+                pos = new_cell.pos
+                if stamps[pos] != generation or new_dist < entries[pos][0]:
+                    entries[pos], stamps[pos] = (new_dist, cell), generation
+                    queue.push(new_dist + static_dists[pos], new_cell)
         return UNREACHABLE
 
-    def _update_safe_paths(self, unit_id, player):
-        assert self.unit and self.unit.id == unit_id
+    def _update_safe_paths(self, unit_idx, player):
+        assert self.unit and self.unit.idx == unit_idx
         self.safe_paths, _, _, _ = self.get_safe_paths(player, self.unit.invulnerable, allow_eog_fire=self.eog_fire)
 
-    def _update_safe_dists_to_all(self, unit_id, player):
-        assert self.unit and self.unit.id == unit_id
+    def _update_safe_dists_to_all(self, unit_idx, player, safe_at_dist=None):
+        '''Search from the unit to every cell, also filling safe_at_dist like get_safe_paths if given'''
+        assert self.unit and self.unit.idx == unit_idx
 
-        for cell in self.board.cells:
-            cell.safe_dists[unit_id] = (UNREACHABLE, None)
+        dists = self.board.safe_dists[unit_idx]
+        dists.reset()
 
         if self.unit.hp <= 0:
             return
 
         init_dist = max(0, self.unit.stunned - self.board.tick)
-        opp_id = 'a' if player.id == 'b' else 'b'
-        self.safe_dists[unit_id] = (0, None)
-        queue = [(init_dist, 0, self)]
-        while queue:
-            dist, _, cell = heapq.heappop(queue)
+        dists[self.pos] = (0, None)
+        queue = self.board.queue_class(init_dist, self)
+        self._search_safe_dists(dists, queue, player, init_dist, safe_at_dist)
+
+    def _repair_safe_dists(self, unit_idx, player, changed_bits):
+        '''Repair the safe dists around the cells in changed_bits, returns whether safe paths need redoing'''
+        assert self.unit and self.unit.idx == unit_idx and not changed_bits & self.bit
+        board = self.board
+        dists = board.safe_dists[unit_idx]
+        entries, stamps, generation = dists.entries, dists.stamps, dists.generation
+
+        children = [[] for _ in range(board.num_cells)]
+        for pos in range(board.num_cells):
+            if stamps[pos] == generation and entries[pos][1] is not None:
+                children[entries[pos][1].pos].append(pos)
+
+        # Cells expanded from an outdated label depend on the neighbor that pushed it, not prev_cell
+        neighbors = board.topology.neighbors
+        stale_bits = dists.stale_bits & ~self.bit
+        cleared_bits = 0
+        stack = [cell.pos for cell in board.cells_from_bits(changed_bits)]
+        while stack:
+            pos = stack.pop()
+            if not cleared_bits >> pos & 1:
+                cleared_bits |= 1 << pos
+                stack.extend(children[pos])
+                if stale_bits:
+                    stack.extend(n for n in neighbors[pos] if stale_bits >> n & 1)
+
+        near = False
+        border = {}
+        for cell in board.cells_from_bits(cleared_bits):
+            if stamps[cell.pos] == generation:
+                near = near or entries[cell.pos][0] < SAFE_PATHS_LEN
+                dists.clear(cell.pos)
+        for cell in board.cells_from_bits(cleared_bits):
+            for pos in neighbors[cell.pos]:
+                if stamps[pos] == generation and pos not in border:
+                    border[pos] = entries[pos][0]
+                    near = near or border[pos] < SAFE_PATHS_LEN
+        if not border:
+            return near
+
+        # Resume from the border, the root resumes from the tick it can first move
+        init_dist = max(0, self.unit.stunned - board.tick)
+        if self.pos in border:
+            border[self.pos] = init_dist
+        queue = None
+        for pos, dist in border.items():
+            if queue is None:
+                queue = board.queue_class(dist, board.cells[pos])
+            else:
+                queue.push(dist, board.cells[pos])
+        self._search_safe_dists(dists, queue, player, init_dist)
+        return near
+
+    def _search_safe_dists(self, dists, queue, player, init_dist, safe_at_dist=None):
+        entries, stamps, generation = dists.entries, dists.stamps, dists.generation
+        for dist, cell in queue:
 
             safe, safe_wait = True, 0
             if dist > init_dist:  # Intrinsically "safe" initially in the sense that we can't change the present
@@ -340,7 +437,7 @@ class Cell:
                 # We know that prev_cell is ok at tick + dist - 1
                 #               and cell is ok at tick + dist + safe_wait
                 # Need to confirm tick + dist through tick + dist + safe_wait - 1
-                prev_cell = cell.safe_dists[unit_id][1]
+                prev_cell = entries[cell.pos][1]
                 prev_safe, prev_safe_wait = prev_cell.is_safe(player, self.board.tick + dist + i, self.unit.invulnerable)
                 if (not prev_safe and not prev_cell is self) or prev_safe_wait != 0:
                     wait_is_ok = False
@@ -348,11 +445,17 @@ class Cell:
             if not wait_is_ok:
                 continue
 
+            if safe_at_dist is not None and dist + safe_wait < len(safe_at_dist):
+                safe_at_dist[dist + safe_wait].append(cell)
+            if dist != entries[cell.pos][0]:
+                dists.stale_bits |= cell.bit
+
             for new_cell in cell.search_neighbors(player):
                 new_dist = dist + safe_wait + 1
-                if new_dist < new_cell.safe_dists[unit_id][0]:
-                    new_cell.safe_dists[unit_id] = (new_dist, cell)
-                    heapq.heappush(queue, (new_dist, random.random(), new_cell))
+                pos = new_cell.pos
+                if stamps[pos] != generation or new_dist < entries[pos][0]:
+                    entries[pos], stamps[pos] = (new_dist, cell), generation
+                    queue.push(new_dist, new_cell)
 
     def _init_neighbors(self):
         self.west = self.neighbor(-1, 0)
@@ -361,11 +464,14 @@ class Cell:
         self.south = self.neighbor(0, -1)
 
     def _on_entity_spawned(self, payload):
+        board = self.board
+        board.zobrist ^= self._entity_key()
         etype = payload['type']
         self.created = payload['created']
         self.expires = payload.get('expires')
         self.hp = payload.get('hp')
         if etype == 'b':
+            board.bomb_bits |= self.bit
             self.bomb_diameter = payload['blast_diameter']
             self.bomb_unit = self.board.units[payload['unit_id']]
             assert not self in self.bomb_unit.bombs
@@ -375,24 +481,256 @@ class Cell:
             assert len(self.bomb_unit.bombs) <= 3
             assert len(self.bomb_unit.player.bombs) <= 3
         elif etype == 'x':
+            board.fire_bits |= self.bit
             self.fire = True
         elif etype == 'bp':
+            board.powerup_bits |= self.bit
             self.blast_powerup = True
         elif etype == 'fp':
+            board.powerup_bits |= self.bit
             self.freeze_powerup = True
         elif etype == 'm':
+            board.wall_bits |= self.bit
             self.wall = True
+            board._update_topology()
         elif etype == 'w' or etype == 'o':
+            board.box_bits |= self.bit
             self.box = True
+        if self.bomb_diameter or self.box or self.blast_powerup or self.freeze_powerup:
+            board._drop_bomb_areas(self.bit)
         if self.fire and self.expires is None: # end-of-game fire
             self.expires = 2000
             self.eog_fire = True
+            if board.eog_schedule is None:
+                board._init_eog_schedule(self.created)
+        board.zobrist ^= self._entity_key()
+
+
+class BucketQueue:
+    '''Dial's algorithm priority queue for the searches' integer dists, ties come out in push order'''
+    __slots__ = ('buckets', 'dists')
+
+    def __init__(self, dist, root):
+        self.buckets = {dist: [root]} # dist: [item]
+        self.dists = [dist] # heap of the dists with a bucket
+
+    def __iter__(self):
+        '''Yields (dist, item), lowest dist first'''
+        buckets, dists = self.buckets, self.dists
+        while dists:
+            dist = heapq.heappop(dists)
+            for item in buckets.pop(dist):
+                yield dist, item
+
+    def push(self, dist, item):
+        bucket = self.buckets.get(dist)
+        if bucket is None:
+            bucket = self.buckets[dist] = []
+            heapq.heappush(self.dists, dist)
+        bucket.append(item)
+
+
+class HeapQueue:
+    '''Binary heap with the BucketQueue interface, yields the same order'''
+    __slots__ = ('heap', 'count')
+
+    def __init__(self, dist, root):
+        self.heap = [(dist, 0, root)]
+        self.count = itertools.count(1) # Push order breaks ties
+
+    def __iter__(self):
+        heap = self.heap
+        while heap:
+            dist, _, item = heapq.heappop(heap)
+            yield dist, item
+
+    def push(self, dist, item):
+        heapq.heappush(self.heap, (dist, next(self.count), item))
+
+
+QUEUES = {'bucket': BucketQueue, 'heap': HeapQueue}
+
+
+class DistField:
+    '''Per-cell (dist, prev_cell) search results, reset in O(1) by bumping the generation'''
+    __slots__ = ('entries', 'stamps', 'generation', 'stale_bits')
+
+    def __init__(self, size):
+        self.entries = [UNREACHED] * size
+        self.stamps = [0] * size # [pos]: generation the entry was written in, older ones read as UNREACHED
+        self.generation = 0
+        self.stale_bits = 0 # Cells expanded from an outdated (dist, prev_cell), see Cell._repair_safe_dists
+
+    def reset(self):
+        self.generation += 1
+        self.stale_bits = 0
+
+    def reaches(self, positions):
+        '''Whether any of the positions has an entry'''
+        stamps, generation = self.stamps, self.generation
+        return any(stamps[pos] == generation for pos in positions)
+
+    def clear(self, pos):
+        self.stamps[pos] = self.generation - 1
+        self.stale_bits &= ~(1 << pos)
+
+    def __getitem__(self, pos):
+        if self.stamps[pos] == self.generation:
+            return self.entries[pos]
+        return UNREACHED
+
+    def __setitem__(self, pos, entry):
+        self.entries[pos] = entry
+        self.stamps[pos] = self.generation
+
+
+class CellDists:
+    '''One cell's column of a list of DistFields: [unit_idx] -> (dist, prev_cell)'''
+    __slots__ = ('fields', 'pos')
+
+    def __init__(self, fields, pos):
+        self.fields = fields
+        self.pos = pos
+
+    def __getitem__(self, unit_idx):
+        return self.fields[unit_idx][self.pos]
+
+
+class BoardArrays:
+    '''Per-cell entity state as numpy arrays, _name memoryviews for ArrayCell. Slower than python on 15x15'''
+    def __init__(self, size):
+        self.wall = np.zeros(size, dtype=bool)
+        self.box = np.zeros(size, dtype=bool)
+        self.hp = np.full(size, NONE, dtype=np.int32)
+        self.created = np.full(size, NONE, dtype=np.int32)
+        self.expires = np.full(size, NONE, dtype=np.int32)
+        self.bomb_diameter = np.zeros(size, dtype=np.int32) # 0 if no bomb
+        self.bomb_unit = np.full(size, NONE, dtype=np.int32) # index into UNIT_IDS
+        self.fire = np.zeros(size, dtype=bool)
+        self.blast_powerup = np.zeros(size, dtype=bool)
+        self.freeze_powerup = np.zeros(size, dtype=bool)
+        self.future_fire_start = np.full((len(PLAYER_IDS), size), NONE, dtype=np.int32) # [player][pos]
+        self.future_fire_end = np.full((len(PLAYER_IDS), size), NONE, dtype=np.int32)
+
+        for name in ('wall', 'box', 'hp', 'created', 'expires', 'bomb_diameter', 'bomb_unit',
+                     'fire', 'blast_powerup', 'freeze_powerup'):
+            setattr(self, '_' + name, memoryview(getattr(self, name)))
+        self._future_fire_start = [memoryview(row) for row in self.future_fire_start]
+        self._future_fire_end = [memoryview(row) for row in self.future_fire_end]
+
+
+class FutureFireView:
+    '''List-like [player_idx]: tick view of one cell's column of a future fire array'''
+    __slots__ = ('rows', 'pos')
+
+    def __init__(self, rows, pos):
+        self.rows = rows # memoryview per player
+        self.pos = pos
+
+    def __getitem__(self, player_idx):
+        value = self.rows[player_idx][self.pos]
+        return None if value == NONE else value
+
+    def __setitem__(self, player_idx, value):
+        self.rows[player_idx][self.pos] = NONE if value is None else value
+
+    def __len__(self):
+        return NUM_PLAYERS
+
+    def __iter__(self):
+        return iter([self[player_idx] for player_idx in range(NUM_PLAYERS)])
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+
+def _array_property(name):
+    view_name = '_' + name
+    def fget(self):
+        return getattr(self.arrays, view_name)[self.pos]
+
+    def fset(self, value):
+        getattr(self.arrays, view_name)[self.pos] = bool(value)
+    return property(fget, fset)
+
+
+def _optional_array_property(name):
+    '''int or None'''
+    view_name = '_' + name
+    def fget(self):
+        value = getattr(self.arrays, view_name)[self.pos]
+        return None if value == NONE else value
+
+    def fset(self, value):
+        getattr(self.arrays, view_name)[self.pos] = NONE if value is None else value
+    return property(fget, fset)
+
+
+def _future_fire_property(name):
+    def fget(self):
+        return getattr(self, name)
+
+    def fset(self, value):
+        view = getattr(self, name)
+        for player_idx in range(NUM_PLAYERS):
+            view[player_idx] = value[player_idx]
+    return property(fget, fset)
+
+
+class ArrayCell(Cell):
+    '''Cell whose entity state is a thin view over the Board's BoardArrays'''
+    __slots__ = ('arrays', '_future_fire_start', '_future_fire_end')
+
+    def __init__(self, board, position):
+        self.arrays = board.arrays
+        self._future_fire_start = FutureFireView(board.arrays._future_fire_start, position)
+        self._future_fire_end = FutureFireView(board.arrays._future_fire_end, position)
+        super().__init__(board, position)
+
+    wall = _array_property('wall')
+    box = _array_property('box')
+    fire = _array_property('fire')
+    blast_powerup = _array_property('blast_powerup')
+    freeze_powerup = _array_property('freeze_powerup')
+    hp = _optional_array_property('hp')
+    created = _optional_array_property('created')
+    expires = _optional_array_property('expires')
+    future_fire_start = _future_fire_property('_future_fire_start')
+    future_fire_end = _future_fire_property('_future_fire_end')
+
+    def has_future_fire(self):
+        pos = self.pos
+        for row in self.arrays._future_fire_start:
+            if row[pos] != NONE:
+                return True
+        return False
+
+    @property
+    def bomb_diameter(self):
+        return self.arrays._bomb_diameter[self.pos] or None
+
+    @bomb_diameter.setter
+    def bomb_diameter(self, value):
+        self.arrays._bomb_diameter[self.pos] = value or 0
+
+    @property
+    def bomb_unit(self):
+        unit_index = self.arrays._bomb_unit[self.pos]
+        return None if unit_index == NONE else self.board.units[UNIT_IDS[unit_index]]
+
+    @bomb_unit.setter
+    def bomb_unit(self, unit):
+        self.arrays._bomb_unit[self.pos] = NONE if unit is None else unit.idx
 
 
 class Unit:
+    __slots__ = ('board', 'id', 'idx', 'x', 'y', 'cell', 'player', 'hp', 'diameter', 'invulnerable',
+                 'stunned', 'goal_list', 'goal_cell', 'bombs')
+
     def __init__(self, board, id):
         self.board = board
         self.id = id
+        self.idx = UNIT_IDS.index(id)
         self.x, self.y = None, None
         self.cell = None
         self.player = None
@@ -406,26 +744,53 @@ class Unit:
 
     def _update_dists(self):
         #start_time = time.time()
-        self.cell._update_safe_dists_to_all(self.id, self.player)
-        #print(f'UPDATE_SAFE_DISTS_TO_ALL {round((time.time() - start_time) * 1000)}')
-        self.cell._update_safe_paths(self.id, self.player)
-        #print(f'UPDATE_SAFE_PATHS {round((time.time() - start_time) * 1000)}')
+        if self.hp > 0 and self.stunned <= self.board.tick and not self.cell.eog_fire:
+            # Same root, start tick and rules: one search fills both
+            safe_at_dist = [[] for _ in range(SAFE_PATHS_LEN)]
+            self.cell._update_safe_dists_to_all(self.idx, self.player, safe_at_dist)
+            self.cell.safe_paths, _, _, _ = self.cell._count_safe_paths(safe_at_dist)
+        else:
+            # Stunned units wait out the stun only in safe dists and units in end-of-game fire
+            # may only cross it in safe paths, so those need the separate bounded search
+            self.cell._update_safe_dists_to_all(self.idx, self.player)
+            self.cell._update_safe_paths(self.idx, self.player)
+        #print(f'UPDATE_SAFE_DISTS_AND_PATHS {round((time.time() - start_time) * 1000)}')
+
+    def _repair_dists(self, changed_bits):
+        if self.hp <= 0 or changed_bits & self.cell.bit: # Whole tree depends on the unit's cell
+            self._update_dists()
+        elif (self.cell._repair_safe_dists(self.idx, self.player, changed_bits)
+              or self.stunned > self.board.tick or self.cell.eog_fire): # Separate safe paths search, see _update_dists
+            self.cell._update_safe_paths(self.idx, self.player)
+
+    def _key(self):
+        '''Zobrist key of the unit's state, see Board.hash'''
+        if self.cell is None:
+            return 0
+        return zobrist_key(ZOBRIST_UNIT, self.idx, self.cell.pos, self.hp, self.diameter, self.invulnerable, self.stunned)
 
     def _on_unit_state(self, payload):
+        self.board.zobrist ^= self._key()
         if self.cell and self.cell.unit == self:
             self.cell.unit = None
+            self.board.unit_bits[self.player.idx] &= ~self.cell.bit
         self.x, self.y = payload['coordinates']
-        self.cell = self.board.cells[self.y * SIZE + self.x]
+        self.player = self.board.players[payload['agent_id']]
+        self.cell = self.board.cell(self.x, self.y)
         self.cell.unit = self
-        self.player = self.board.players['a'] if payload['agent_id'] == 'a' else self.board.players['b']
+        self.board.unit_bits[self.player.idx] |= self.cell.bit
         self.hp = payload['hp']
         self.diameter = payload['blast_diameter']
         self.invulnerable = payload['invulnerable']
         self.stunned = payload['stunned']
+        self.board.zobrist ^= self._key()
 
     def _on_unit_move(self, move_action):
+        self.board.zobrist ^= self._key()
+        self.board.changes.add(self.cell.bit)
         if self.cell.unit == self:
             self.cell.unit = None
+            self.board.unit_bits[self.player.idx] &= ~self.cell.bit
         if move_action == "up":
             self.y += 1
         elif move_action == "down":
@@ -434,24 +799,671 @@ class Unit:
             self.x += 1
         elif move_action == "left":
             self.x -= 1
-        self.cell = self.board.cells[self.y * SIZE + self.x]
+        self.cell = self.board.cell(self.x, self.y)
         self.cell.unit = self
+        self.board.unit_bits[self.player.idx] |= self.cell.bit
+        self.board.changes.add(self.cell.bit)
+        self.board.zobrist ^= self._key()
 
 
 class Player:
+    __slots__ = ('id', 'idx', 'opp', 'units', 'bombs')
+
     def __init__(self, id):
         self.id = id
+        self.idx = PLAYER_IDS.index(id)
+        self.opp = None # Opponent Player, set by Board
         self.units = []
         self.bombs = []
 
 
+class Topology:
+    '''Static board structure, rebuilt only when walls change (see Board._update_topology)'''
+    def __init__(self, board):
+        cells = board.cells
+        self.width = board.width
+        self.west_edge_bits = board.west_edge_bits
+        self.east_edge_bits = board.east_edge_bits
+        self.open_bits = board.all_bits & ~board.wall_bits
+        self._rings = {} # pos: rings result, only worked out for the positions asked about
+        self._static_dists = {} # pos: static_dists row
+        self.adjacent = [] # [pos]: [north, east, south, west] cells, None if off the board or a wall
+        self.adjacent_orders = [] # [pos][order]: the cells in adjacent[pos], ordered by NEIGHBOR_ORDERS[order]
+        self.adjacent_and_self = [] # [pos]: adjacent[pos] + [cell]
+        self.neighbors = [] # [pos]: positions of the cells in adjacent[pos]
+        self.neighbor_bits = [] # [pos]: bitboard of the same cells
+        self.rays = [] # [pos]: north, south, east, west tuples of the cells up to the first wall
+        for cell in cells:
+            adjacent = [n if n and not n.wall else None for n in (cell.north, cell.east, cell.south, cell.west)]
+            self.adjacent.append(adjacent)
+            self.adjacent_orders.append([tuple(adjacent[i] for i in order if adjacent[i]) for order in NEIGHBOR_ORDERS])
+            self.adjacent_and_self.append(adjacent + [cell])
+            self.neighbors.append(tuple(n.pos for n in adjacent if n))
+            self.neighbor_bits.append(sum(n.bit for n in adjacent if n))
+            rays = []
+            for direction in ('north', 'south', 'east', 'west'):
+                ray = []
+                nearby_cell = getattr(cell, direction)
+                while nearby_cell and not nearby_cell.wall:
+                    ray.append(nearby_cell)
+                    nearby_cell = getattr(nearby_cell, direction)
+                rays.append(tuple(ray))
+            self.rays.append(tuple(rays))
+
+    def rings(self, pos):
+        '''Bitboards of the cells at static distance (around walls only) 0, 1, 2... from pos, None for walls'''
+        if pos in self._rings:
+            return self._rings[pos]
+        bits = 1 << pos
+        if not bits & self.open_bits:
+            self._rings[pos] = None
+            return None
+        width, open_bits = self.width, self.open_bits
+        west_edge_bits, east_edge_bits = self.west_edge_bits, self.east_edge_bits
+        rings = [bits]
+        seen = bits
+        while bits:
+            bits = ((bits << width) | (bits >> width)
+                    | ((bits & ~east_edge_bits) << 1) | ((bits & ~west_edge_bits) >> 1)) & open_bits & ~seen
+            seen |= bits
+            if bits:
+                rings.append(bits)
+        rings = self._rings[pos] = tuple(rings)
+        return rings
+
+    def flood(self, bits, open_bits):
+        '''Cells connected to the ones in bits through open_bits, bits included'''
+        width, west_edge_bits, east_edge_bits = self.width, self.west_edge_bits, self.east_edge_bits
+        region = bits
+        while bits:
+            bits = ((bits << width) | (bits >> width)
+                    | ((bits & ~east_edge_bits) << 1) | ((bits & ~west_edge_bits) >> 1)) & open_bits & ~region
+            region |= bits
+        return region
+
+    def static_bits(self, pos, max_dist):
+        '''Cells within max_dist of pos, ignoring everything but walls'''
+        bits = 0
+        for ring in (self.rings(pos) or ())[:max_dist + 1]:
+            bits |= ring
+        return bits
+
+    def static_dists(self, pos):
+        '''[other_pos]: static distance from other_pos to pos, UNREACHABLE if walls separate them'''
+        dists = self._static_dists.get(pos)
+        if dists is None:
+            dists = self._static_dists[pos] = [UNREACHABLE] * len(self.neighbors)
+            for dist, ring in enumerate(self.rings(pos) or ()):
+                while ring:
+                    low_bit = ring & -ring
+                    dists[low_bit.bit_length() - 1] = dist
+                    ring ^= low_bit
+            for wall_pos in range(len(self.neighbors)): # Walls can be left but not entered
+                if not (1 << wall_pos) & self.open_bits and self.neighbors[wall_pos]:
+                    dists[wall_pos] = min(UNREACHABLE, min(dists[neighbor] for neighbor in self.neighbors[wall_pos]) + 1)
+        return dists
+
+
+class BombChains:
+    '''Future fire reach of every bomb and the bombs it sets off, kept up to date by Board.get_bomb_chains'''
+    def __init__(self, board):
+        self.board = board
+        self.bomb_bits = 0
+        self.box_bits = board.box_bits
+        self.diameters = {} # pos: bomb_diameter the area was found with
+        self.area = {} # pos: bitboard of the bomb's future fire, stopping before boxes (unlike get_bomb_area_bits)
+        self.blockers = {} # pos: bitboard of the boxes that stopped its rays
+        self.cluster = {} # pos: bitboard of the bombs it sets off, directly or not, itself included
+        self.cluster_area = {} # pos: union of the areas of its cluster
+        self.update()
+
+    def update(self):
+        '''Redo the areas of the bombs that changed or that a changed box stopped or now stops'''
+        board = self.board
+        changed_boxes = self.box_bits ^ board.box_bits
+        dirty_bits = self.bomb_bits ^ board.bomb_bits
+        for pos, diameter in self.diameters.items():
+            if (board.cells[pos].bomb_diameter != diameter
+                or (self.area[pos] | self.blockers[pos]) & changed_boxes):
+                dirty_bits |= 1 << pos
+        if not dirty_bits:
+            return
+
+        for cell in board.cells_from_bits(dirty_bits):
+            pos = cell.pos
+            if cell.bit & board.bomb_bits:
+                self.diameters[pos] = cell.bomb_diameter
+                self.area[pos], self.blockers[pos] = self.find_area(cell, cell.bomb_diameter)
+            elif pos in self.diameters:
+                del self.diameters[pos], self.area[pos], self.blockers[pos]
+        self.bomb_bits = board.bomb_bits
+        self.box_bits = board.box_bits
+
+        self.cluster, self.cluster_area = {}, {}
+        for pos in self.diameters:
+            cluster = new_bits = 1 << pos
+            while new_bits:
+                low_bit = new_bits & -new_bits
+                new_bits ^= low_bit
+                chained_bits = self.area[low_bit.bit_length() - 1] & self.bomb_bits & ~cluster
+                cluster |= chained_bits
+                new_bits |= chained_bits
+            self.cluster[pos] = cluster
+            cluster_area = 0
+            for bomb_cell in board.cells_from_bits(cluster):
+                cluster_area |= self.area[bomb_cell.pos]
+            self.cluster_area[pos] = cluster_area
+
+    def find_area(self, cell, diameter):
+        '''(area, blockers) bitboards for a blast of diameter at cell'''
+        if cell.box or cell.wall:
+            return 0, 0
+        area, blockers = cell.bit, 0
+        for ray in self.board.topology.rays[cell.pos]:
+            for nearby_cell in ray[:diameter // 2]:
+                if nearby_cell.box:
+                    blockers |= nearby_cell.bit
+                    break
+                area |= nearby_cell.bit
+        return area, blockers
+
+    def detonation_tick(self, pos):
+        '''Earliest tick the bomb at pos goes off, counting the bombs that would set it off'''
+        ticks = [self.board.cells[other_pos].expires for other_pos, cluster in self.cluster.items()
+                 if cluster & (1 << pos) and self.board.cells[other_pos].expires is not None]
+        return min(ticks) if ticks else None
+
+
+class TargetRanges:
+    '''Keeps every cell's target_range up to date, only redoing the cells whose rays see a change'''
+    def __init__(self, board):
+        self.board = board
+        self.box_bits = board.box_bits
+        self.powerup_bits = board.powerup_bits
+        self.scans = [()] * board.num_cells # [pos]: (dist, nearby_pos) the rays from pos look at, in summing order
+        self.watched = [()] * board.num_cells # [pos]: positions whose seen_by has pos
+        self.seen_by = [set() for _ in range(board.num_cells)] # [pos]: positions whose scans look at pos
+        self.box_values = {} # pos: 1 / -1 / 0 by which player is closer, over 10 ** (hp - 1)
+        self.unit_values = {} # pos: 20 / -20 for a stunned unit, positive values favor player a
+        for cell in board.cells:
+            self._scan(cell)
+        self._dirty = set(range(board.num_cells))
+
+    def _scan(self, cell):
+        for nearby_pos in self.watched[cell.pos]:
+            self.seen_by[nearby_pos].discard(cell.pos)
+        scan = []
+        watched = []
+        if not (cell.wall or cell.box):
+            for ray in self.board.topology.rays[cell.pos]:
+                for dist, nearby_cell in enumerate(ray[:TARGET_RANGE_LEN]):
+                    watched.append(nearby_cell.pos)
+                    if nearby_cell.blast_powerup or nearby_cell.freeze_powerup:
+                        break
+                    scan.append((dist, nearby_cell.pos))
+                    if nearby_cell.box:
+                        break
+        self.scans[cell.pos] = scan
+        self.watched[cell.pos] = watched
+        for nearby_pos in watched:
+            self.seen_by[nearby_pos].add(cell.pos)
+
+    def update(self):
+        board = self.board
+        dirty, self._dirty = self._dirty, set()
+
+        changed_bits = (self.box_bits ^ board.box_bits) | (self.powerup_bits ^ board.powerup_bits)
+        for changed_cell in board.cells_from_bits(changed_bits):
+            for pos in [changed_cell.pos] + list(self.seen_by[changed_cell.pos]):
+                self._scan(board.cells[pos])
+                dirty.add(pos)
+        self.box_bits, self.powerup_bits = board.box_bits, board.powerup_bits
+
+        box_values, unit_values = self.values(board)
+        for values, new_values in ((self.box_values, box_values), (self.unit_values, unit_values)):
+            for pos in values.keys() | new_values.keys():
+                if values.get(pos) != new_values.get(pos):
+                    dirty |= self.seen_by[pos]
+        self.box_values, self.unit_values = box_values, unit_values
+
+        for pos in dirty:
+            target_range = [0] * TARGET_RANGE_LEN
+            for dist, nearby_pos in self.scans[pos]:
+                value = box_values.get(nearby_pos)
+                if value is None:
+                    value = unit_values.get(nearby_pos)
+                    if value is None:
+                        continue
+                for i in range(dist, TARGET_RANGE_LEN):
+                    target_range[i] += value
+            board.cells[pos].target_range = target_range
+
+    @staticmethod
+    def values(board):
+        '''box_values and unit_values for the board as it is now'''
+        box_values = {}
+        for box_cell in board.cells_from_bits(board.box_bits):
+            min_dist = [UNREACHABLE] * NUM_PLAYERS
+            for unit in board.units.values():
+                if unit.hp <= 0:
+                    continue
+                safe_dist = board.safe_dists[unit.idx][box_cell.pos][0]
+                if safe_dist < min_dist[unit.player.idx]: # todo safe dist to boxes?
+                    min_dist[unit.player.idx] = safe_dist
+            multiplier = 0
+            if min_dist[0] < min_dist[1]:
+                multiplier = 1
+            elif min_dist[0] > min_dist[1]:
+                multiplier = -1
+            box_values[box_cell.pos] = multiplier / (10 ** (box_cell.hp - 1)) # 1, 0.1, 0.01
+
+        unit_values = {}
+        for unit in board.units.values():
+            if (unit.cell.unit is unit
+                and unit.hp > 0 # not dead
+                and unit.stunned >= board.tick + 1 + 5): # still stunned when bomb can go off
+                unit_values[unit.cell.pos] = (1 if (unit.player.idx == 1) else -1) * 20
+        return box_values, unit_values
+
+
+class ArrayTargetRanges:
+    '''TargetRanges for the numpy backend, redoing every cell from the board arrays on each update'''
+    def __init__(self, board):
+        self.board = board
+        num_cells = board.num_cells
+        self.rays = np.full((4, TARGET_RANGE_LEN, num_cells), num_cells) # [direction][dist][pos], num_cells past a wall
+        for cell in board.cells:
+            for direction, ray in enumerate(board.topology.rays[cell.pos]):
+                for dist, nearby_cell in enumerate(ray[:TARGET_RANGE_LEN]):
+                    self.rays[direction][dist][cell.pos] = nearby_cell.pos
+        self.stop = np.ones(num_cells + 1, dtype=bool) # [pos], True past the edge
+        self.last = np.zeros(num_cells + 1, dtype=bool)
+        self.found = np.zeros(num_cells + 1)
+
+    def update(self):
+        board, arrays = self.board, self.board.arrays
+        stop, last, found = self.stop, self.last, self.found
+        num_cells = board.num_cells
+        np.logical_or(arrays.blast_powerup, arrays.freeze_powerup, out=stop[:num_cells])
+        last[:num_cells] = arrays.box
+        found[:] = 0
+        box_values, unit_values = TargetRanges.values(board)
+        for values in (unit_values, box_values): # box first, as in TargetRanges
+            if values:
+                found[list(values.keys())] = list(values.values())
+
+        ended = stop[self.rays] # rays end before powerups
+        ended[:, 1:] |= last[self.rays[:, :-1]] # and after boxes
+        reached = ~np.logical_or.accumulate(ended, axis=1)
+        reached &= ~(arrays.wall | arrays.box) # no rays from walls or boxes
+        found = np.where(reached, found[self.rays], 0.0)
+        target_ranges = np.zeros((TARGET_RANGE_LEN, num_cells))
+        for direction, dist in zip(*np.nonzero(found.any(axis=2))): # adding 0.0s changes nothing
+            target_ranges[dist:] += found[direction, dist]
+        for cell, target_range in zip(board.cells, target_ranges.T.tolist()):
+            cell.target_range = target_range
+
+
+TARGET_RANGES = {'incremental': TargetRanges, 'numpy': ArrayTargetRanges}
+
+
+class CutIndex:
+    '''Articulation points and biconnected components of the open cells, from an iterative Tarjan search'''
+    def __init__(self, board, open_bits):
+        self.board = board
+        self.open_bits = open_bits
+        neighbors = board.topology.neighbors
+        order = self.order = [None] * board.num_cells # [pos]: preorder number, None if not open
+        size = self.size = [1] * board.num_cells # [pos]: cells in pos's subtree, order[pos] to order[pos] + size[pos] - 1
+        root = self.root = [None] * board.num_cells # [pos]: first cell searched in pos's region
+        cuts = self.cuts = {} # pos: children whose subtrees only reach the rest of the region through pos
+        self.preorder = [] # [order[pos]]: pos
+        self.blocks = [] # bitboards of the biconnected components, connected without any one cell
+        low = [None] * board.num_cells
+        parent = [None] * board.num_cells
+        for start_cell in board.cells_from_bits(open_bits):
+            start = start_cell.pos
+            if order[start] is not None:
+                continue
+            order[start] = low[start] = len(self.preorder)
+            root[start] = start
+            self.preorder.append(start)
+            stack = [(start, iter(neighbors[start]))]
+            visited = [start] # Cells not yet in a block
+            while stack:
+                pos, untried = stack[-1]
+                for new_pos in untried:
+                    if not (1 << new_pos) & open_bits:
+                        continue
+                    if order[new_pos] is None:
+                        order[new_pos] = low[new_pos] = len(self.preorder)
+                        root[new_pos] = start
+                        parent[new_pos] = pos
+                        self.preorder.append(new_pos)
+                        visited.append(new_pos)
+                        stack.append((new_pos, iter(neighbors[new_pos])))
+                        break
+                    if new_pos != parent[pos] and order[new_pos] < low[pos]:
+                        low[pos] = order[new_pos]
+                else:
+                    stack.pop()
+                    if not stack:
+                        continue
+                    prev_pos = stack[-1][0]
+                    size[prev_pos] += size[pos]
+                    if low[pos] < low[prev_pos]:
+                        low[prev_pos] = low[pos]
+                    if low[pos] >= order[prev_pos]: # prev_pos separates pos's subtree from the rest
+                        cuts.setdefault(prev_pos, []).append(pos)
+                        block = 1 << prev_pos
+                        while True:
+                            block_pos = visited.pop()
+                            block |= 1 << block_pos
+                            if block_pos == pos:
+                                break
+                        self.blocks.append(block)
+            if len(cuts.get(start, ())) < 2: # The root only splits its region between its children
+                cuts.pop(start, None)
+        self.articulation_bits = sum(1 << pos for pos in cuts) # Cells that split their region
+
+    def cut_cells(self, cell, bits, min_count=1):
+        '''[(cut_cell, count)]: cells whose occupation cuts cell off from count >= min_count of bits, most first'''
+        if self.order[cell.pos] is None:
+            return []
+        counts = [0] # [i]: cells in bits among the first i in preorder
+        for pos in self.preorder:
+            counts.append(counts[-1] + ((bits >> pos) & 1))
+        order, size = self.order, self.size
+        start = self.root[cell.pos]
+        region_count = counts[order[start] + size[start]] - counts[order[start]]
+        cell_order = order[cell.pos]
+        cut_cells = []
+        for pos, children in self.cuts.items():
+            if pos == cell.pos or self.root[pos] != start:
+                continue
+            count = 0
+            for child in children:
+                first, end = order[child], order[child] + size[child]
+                if first <= cell_order < end: # All but the child's subtree and pos are cut off
+                    count = region_count - (counts[end] - counts[first]) - ((bits >> pos) & 1)
+                    break
+                count += counts[end] - counts[first]
+            if count >= min_count:
+                cut_cells.append((self.board.cells[pos], count))
+        cut_cells.sort(key=lambda cut_cell: -cut_cell[1])
+        return cut_cells
+
+
+class SafeRegions:
+    '''Connected regions of the cells a unit can stand on, which its safe paths stay in'''
+    def __init__(self, board):
+        self.board = board
+        self.open_bits = 0
+        self.future_fire_bits = 0
+        self.label = [None] * board.num_cells # [pos]: id of pos's region, None if pos isn't open
+        self.region_bits = {} # region_id: bitboard of the region's cells
+        self.truly_safe = {} # region_id: number of the region's cells without future fire
+        self._next_id = 0
+        self.update()
+
+    def size(self, cell):
+        '''Number of cells in cell's region (0 if it isn't open)'''
+        region_id = self.label[cell.pos]
+        return 0 if region_id is None else popcount(self.region_bits[region_id])
+
+    def num_truly_safe(self, cell):
+        '''Number of truly safe cells in cell's region'''
+        region_id = self.label[cell.pos]
+        return 0 if region_id is None else self.truly_safe[region_id]
+
+    def bits(self, cell):
+        '''Bitboard of cell's region'''
+        region_id = self.label[cell.pos]
+        return 0 if region_id is None else self.region_bits[region_id]
+
+    def update(self):
+        board = self.board
+        closed_bits = board.wall_bits | board.box_bits | board.bomb_bits
+        for cell in board.cells_from_bits(board.fire_bits):
+            if cell.expires > board.tick + SAFE_PATHS_LEN: # End-of-game fire, the rest burns out in time
+                closed_bits |= cell.bit
+        open_bits = board.all_bits & ~closed_bits
+        for unit in board.units.values():
+            if unit.hp > 0:
+                open_bits |= unit.cell.bit
+        future_fire_bits = board.future_fire_bits()
+
+        changed_bits = open_bits ^ self.open_bits
+        if changed_bits:
+            label, region_bits = self.label, self.region_bits
+            neighbor_bits = board.topology.neighbor_bits
+            touched_bits = changed_bits
+            for cell in board.cells_from_bits(changed_bits):
+                touched_bits |= neighbor_bits[cell.pos]
+            redo_bits = changed_bits & open_bits # Opened, joining the regions around them
+            for cell in board.cells_from_bits(touched_bits & self.open_bits):
+                region_id = label[cell.pos]
+                if region_id in region_bits:
+                    redo_bits |= region_bits.pop(region_id)
+                    del self.truly_safe[region_id]
+            for cell in board.cells_from_bits(changed_bits & ~open_bits):
+                label[cell.pos] = None
+            redo_bits &= open_bits
+            while redo_bits:
+                bits = board.topology.flood(redo_bits & -redo_bits, open_bits)
+                redo_bits &= ~bits
+                region_id = self._next_id
+                self._next_id += 1
+                for cell in board.cells_from_bits(bits):
+                    label[cell.pos] = region_id
+                region_bits[region_id] = bits
+                self.truly_safe[region_id] = popcount(bits & ~future_fire_bits)
+            self.open_bits = open_bits
+
+        if future_fire_bits != self.future_fire_bits:
+            for region_id, bits in self.region_bits.items():
+                self.truly_safe[region_id] = popcount(bits & ~future_fire_bits)
+            self.future_fire_bits = future_fire_bits
+
+
+class DangerGrid:
+    '''Each player's fire timeline, rebuilt after future fire changes, advanced or patched otherwise'''
+    def __init__(self, board):
+        self.board = board
+        self.tick = board.tick
+        self.ranges = [[None] * board.num_cells for _ in range(NUM_PLAYERS)] # [player_idx][pos]: (danger_start, safe_begin) fire ranges
+        self.unsafe = [[None] * board.num_cells for _ in range(NUM_PLAYERS)] # [player_idx][pos]: merged [start, end) ticks not to stop at
+        self.lethal = [[None] * board.num_cells for _ in range(NUM_PLAYERS)] # [player_idx][pos]: bitmask of the tick offsets on fire
+        self.next_safe = [[None] * board.num_cells for _ in range(NUM_PLAYERS)] # [player_idx][pos][offset]: first safe tick >= tick + offset
+        self.update(board.fire_bits | board.future_fire_bits())
+
+    def update(self, bits):
+        for cell in self.board.cells_from_bits(bits):
+            for player_idx in range(NUM_PLAYERS):
+                self._update_cell(cell, player_idx)
+
+    def _update_cell(self, cell, player_idx):
+        own_idx, opp_idx = player_idx, OPPONENT[player_idx]
+        pos = cell.pos
+
+        danger_ranges = []
+        if cell.fire:
+            danger_ranges.append((cell.created, cell.expires))
+        # fire_start = 5
+        #   tick = 2, arrive = 3 (Ok, can leave on 4 safely)
+        #   tick = 3, arrive = 4 (Bad, can't leave in time)
+        #   tick = 4, arrive = 5 (Bad, arrive on fire turn)
+        # fire_end = 10
+        #   tick = 8, arrive = 9 (Bad)
+        #   tick = 9, arrive = 10 (Ok)
+        #   tick = 10, arrive = 11 (Ok)
+        if cell.future_fire_start[opp_idx] is not None:
+            danger_ranges.append((cell.future_fire_start[opp_idx], cell.future_fire_end[opp_idx]))
+        if cell.future_fire_end[own_idx] is not None:
+            danger_ranges.append((cell.future_fire_end[own_idx] - 5, cell.future_fire_end[own_idx])) # TODO check
+        if not danger_ranges:
+            self.ranges[player_idx][pos] = None
+            self.unsafe[player_idx][pos] = None
+            self.lethal[player_idx][pos] = None
+            self.next_safe[player_idx][pos] = None
+            return
+
+        unsafe_ranges = []
+        for danger_start, safe_begin in danger_ranges:
+            if danger_start < safe_begin:
+                unsafe_ranges.append((danger_start - 1, safe_begin))
+            else: # Empty range (e.g. detonated before its fire could start), still can't stop just before it
+                unsafe_ranges.append((safe_begin - 1, safe_begin))
+        unsafe = []
+        for unsafe_start, safe_begin in sorted(unsafe_ranges):
+            if unsafe and unsafe_start <= unsafe[-1][1]:
+                unsafe[-1][1] = max(unsafe[-1][1], safe_begin)
+            else:
+                unsafe.append([unsafe_start, safe_begin])
+
+        self.ranges[player_idx][pos] = danger_ranges
+        self.unsafe[player_idx][pos] = unsafe
+        self._update_window(player_idx, pos)
+
+    def _update_window(self, player_idx, pos):
+        '''lethal and next_safe of the cell for the HORIZON ticks from self.tick'''
+        tick = self.tick
+        lethal = 0
+        for danger_start, safe_begin in self.ranges[player_idx][pos]:
+            lo, hi = max(danger_start, tick) - tick, min(safe_begin, tick + HORIZON) - tick
+            if lo < hi:
+                lethal |= ((1 << (hi - lo)) - 1) << lo
+
+        next_safe = list(range(tick, tick + HORIZON))
+        for unsafe_start, safe_begin in self.unsafe[player_idx][pos]:
+            lo, hi = max(unsafe_start, tick) - tick, min(safe_begin, tick + HORIZON) - tick
+            if lo < hi:
+                next_safe[lo:hi] = [safe_begin] * (hi - lo)
+
+        self.lethal[player_idx][pos] = lethal
+        self.next_safe[player_idx][pos] = next_safe
+
+    def advance(self, tick):
+        '''Move the timeline to tick when no fire changed, shifting the lethal and next_safe windows'''
+        delta = tick - self.tick
+        self.tick = tick
+        for player_idx in range(NUM_PLAYERS):
+            lethal, next_safe = self.lethal[player_idx], self.next_safe[player_idx]
+            for pos, danger_ranges in enumerate(self.ranges[player_idx]):
+                if danger_ranges is None:
+                    continue
+                if not 0 < delta < HORIZON:
+                    self._update_window(player_idx, pos)
+                    continue
+                tail = tick + HORIZON - delta # First tick the shifted windows don't cover
+                cell_lethal = lethal[pos] >> delta
+                for danger_start, safe_begin in danger_ranges:
+                    lo, hi = max(danger_start, tail) - tick, min(safe_begin, tick + HORIZON) - tick
+                    if lo < hi:
+                        cell_lethal |= ((1 << (hi - lo)) - 1) << lo
+                lethal[pos] = cell_lethal
+                window = next_safe[pos][delta:]
+                for new_tick in range(tail, tick + HORIZON):
+                    for unsafe_start, safe_begin in self.unsafe[player_idx][pos]:
+                        if unsafe_start <= new_tick < safe_begin:
+                            window.append(safe_begin)
+                            break
+                    else:
+                        window.append(new_tick)
+                next_safe[pos] = window
+
+    def is_lethal(self, player_idx, pos, tick):
+        offset = tick - self.tick
+        if 0 <= offset < HORIZON:
+            return bool(self.lethal[player_idx][pos] >> offset & 1)
+        return any(danger_start <= tick < safe_begin
+                   for danger_start, safe_begin in self.ranges[player_idx][pos] or ())
+
+    def next_safe_tick(self, player_idx, pos, tick):
+        offset = tick - self.tick
+        if 0 <= offset < HORIZON:
+            return self.next_safe[player_idx][pos][offset]
+        for unsafe_start, safe_begin in self.unsafe[player_idx][pos] or ():
+            if unsafe_start <= tick < safe_begin:
+                return safe_begin
+        return tick
+
+
+class TickChanges:
+    '''What changed since Board._update_tick_state last ran, recorded by events and simulated actions'''
+    __slots__ = ('bits', 'units', 'future_fire')
+
+    def __init__(self):
+        self.bits = 0 # Cells whose entities, units or move reservations changed
+        self.units = set() # idx of the units with a new unit_state
+        self.future_fire = False # A bomb, box, wall or fire changed, or a unit with bombs got a new unit_state
+
+    def add(self, bits, future_fire=False):
+        self.bits |= bits
+        self.future_fire = self.future_fire or future_fire
+
+
 class Board:
-    def __init__(self, game_state):
+    def __init__(self, game_state, backend='python', queue='bucket', target_ranges='incremental', seed=None):
         self.tick = 0
-
-        self.cells = [Cell(self, i) for i in range(SIZE2)]
-        self.players = {player_id: Player(player_id) for player_id in ['a','b']}
-        self.units = {unit_id: Unit(self, unit_id) for unit_id in ['c','d','e','f','g','h']}
+        self.width = game_state['world']['width']
+        self.height = game_state['world']['height']
+        self.num_cells = self.width * self.height
+        self.all_bits = (1 << self.num_cells) - 1
+        self.west_edge_bits = sum(1 << (y * self.width) for y in range(self.height)) # x == 0
+        self.east_edge_bits = self.west_edge_bits << (self.width - 1) # x == width - 1
+
+        # Bitboards: bit n is set if cells[n] holds the entity
+        self.wall_bits = 0
+        self.box_bits = 0
+        self.bomb_bits = 0
+        self.fire_bits = 0
+        self.powerup_bits = 0
+        self.unit_bits = [0] * NUM_PLAYERS # [player_idx]
+        self.future_fire_start_bits = [0] * NUM_PLAYERS # [player_idx]: cells with future_fire_start set
+        self.zobrist = 0 # XOR of the Zobrist keys of every unit and cell, see hash
+        self.topology = None
+        self.fire_spawn_interval = game_state['config']['fire_spawn_interval_ticks']
+        self.eog_starts = None # First cell of each end-of-game fire spiral, see init_eog_fire_neighbors
+        self.eog_schedule = None # [spiral]: ([spawn tick], [cell]) once end-of-game fire starts
+        self._bomb_chains = None # Built with the topology, see get_bomb_chains
+        self._target_ranges = None # Built with the topology, see _update_target_range
+        self._cut_index = None # See get_cut_index
+        self._safe_regions = None # See get_safe_regions
+        self.safe_dists = [DistField(self.num_cells) for _ in range(NUM_UNITS + 1)] # [unit_idx], plus TEMP
+        self.dists = DistField(self.num_cells) # Scratch space for Cell.get_dist
+        self.queue_class = QUEUES[queue] # Priority queue for the searches
+        self.seed = random.randrange(1 << 32) if seed is None else seed # Replays the searches' tie-breaks
+        self._random = random.Random(self.seed)
+        self.neighbor_order = None # [pos]: NEIGHBOR_ORDERS index of the cell's search order this tick
+        self.move_order = None # [pos]: MOVE_ORDERS index of the cell's move order this tick
+        self._draw_neighbor_orders()
+        self.version = 0 # Bumped by every change that can affect search results, see _invalidate
+        self._safe_paths_cache = {} # (pos, player_idx, invulnerable, allow_eog_fire): (get_safe_paths result, region_bits)
+        self._escape_dists_cache = {} # (player_idx, invulnerable): escape_dists result
+        self._bomb_areas = {} # (pos, diameter): get_bomb_area_bits result
+        self._bomb_area_keys = [set() for _ in range(self.num_cells)] # [pos]: _bomb_areas keys whose area has pos
+        self.changes = TickChanges() # Since the last _update_tick_state
+        self._future_fire_eog = None # _eog_latest() when future fire was last updated
+        self._searched_tick = None # Tick of the last _update_dists
+        self._searched_danger_bits = 0 # search_danger_bits() at the last _update_dists
+
+        if backend == 'numpy' and np is None:
+            print('WARNING: numpy is not installed, falling back to python board backend')
+            backend = 'python'
+        self.backend = backend
+        self.arrays = BoardArrays(self.num_cells) if backend == 'numpy' else None
+        if target_ranges == 'numpy' and backend != 'numpy':
+            print('WARNING: numpy target ranges need the numpy board backend, using incremental')
+            target_ranges = 'incremental'
+        self.target_ranges_class = TARGET_RANGES[target_ranges]
+        cell_class = ArrayCell if backend == 'numpy' else Cell
+
+        self.cells = [cell_class(self, i) for i in range(self.num_cells)]
+        self.players = {player_id: Player(player_id) for player_id in PLAYER_IDS}
+        for player in self.players.values():
+            player.opp = self.players[PLAYER_IDS[OPPONENT[player.idx]]]
+        self.units = {unit_id: Unit(self, unit_id) for unit_id in UNIT_IDS}
 
         for unit_id in game_state['unit_state']:
             self.units[unit_id]._on_unit_state(game_state['unit_state'][unit_id])
@@ -465,17 +1477,200 @@ class Board:
         self.init_eog_fire_neighbors()
         for entity in game_state['entities']:
             self._on_entity_spawned(entity)
+        self.topology = Topology(self)
+        self.danger = DangerGrid(self)
 
         agent_id = game_state['connection']['agent_id']
-        self.player = self.players['a'] if agent_id == 'a' else self.players['b']
-        self.opp = self.players['a'] if agent_id == 'b' else self.players['b']
+        self.player = self.players[agent_id]
+        self.opp = self.player.opp
 
     def cell(self, x, y):
-        return self.cells[y * SIZE + x]
+        return self.cells[y * self.width + x]
+
+    def hash(self):
+        '''Zobrist hash of the units and entities, kept up to date by the event handlers (not simulated actions)'''
+        return self.zobrist
+
+    def _compute_hash(self):
+        '''hash() from scratch'''
+        key = 0
+        for unit in self.units.values():
+            key ^= unit._key()
+        for cell in self.cells:
+            key ^= cell._entity_key()
+        return key
+
+    def _draw_neighbor_orders(self):
+        '''New random neighbor orders for every cell, the searches' tie-breaks until the next tick'''
+        self.neighbor_order = self._random.choices(range(len(NEIGHBOR_ORDERS)), k=self.num_cells)
+        self.move_order = self._random.choices(range(len(MOVE_ORDERS)), k=self.num_cells)
+
+    def _update_topology(self):
+        if self.topology is not None: # Built once all initial entities have spawned
+            self.topology = Topology(self)
+            self._drop_bomb_areas()
+            self._bomb_chains = None
+            self._target_ranges = None
+
+    def _invalidate(self, bits=None):
+        '''Bump the version after the cells in bits changed (any if None), dropping memoized safe paths on them'''
+        self.version += 1
+        self._escape_dists_cache.clear()
+        if bits is None:
+            self._safe_paths_cache.clear()
+            return
+        cache = self._safe_paths_cache
+        for key in [key for key, (_, region_bits) in cache.items() if region_bits & bits]:
+            del cache[key]
+
+    def get_bomb_chains(self):
+        '''BombChains for the current bombs and boxes'''
+        if self._bomb_chains is None:
+            self._bomb_chains = BombChains(self)
+        else:
+            self._bomb_chains.update()
+        return self._bomb_chains
+
+    def get_cut_index(self):
+        '''CutIndex for the cells open now, rebuilt after walls, boxes, bombs or live units changed'''
+        open_bits = self.all_bits & ~(self.wall_bits | self.box_bits | self.bomb_bits)
+        for unit in self.units.values():
+            if unit.hp > 0:
+                open_bits |= unit.cell.bit
+        if self._cut_index is None or self._cut_index.open_bits != open_bits:
+            self._cut_index = CutIndex(self, open_bits)
+        return self._cut_index
+
+    def get_safe_regions(self):
+        '''SafeRegions for the board as it is now'''
+        if self._safe_regions is None:
+            self._safe_regions = SafeRegions(self)
+        else:
+            self._safe_regions.update()
+        return self._safe_regions
+
+    def _update_danger(self, bits=None):
+        '''Rebuild the danger timeline, or only patch the cells in bits'''
+        self._invalidate(bits)
+        if bits is None:
+            self.danger = DangerGrid(self)
+        else:
+            self.changes.add(bits, future_fire=True) # Future fire was patched along with it
+            self.danger.update(bits)
+
+    def cells_from_bits(self, bits):
+        cells = []
+        while bits:
+            low_bit = bits & -bits
+            cells.append(self.cells[low_bit.bit_length() - 1])
+            bits ^= low_bit
+        return cells
+
+    def search_danger_bits(self):
+        '''Cells whose danger the searches look at, end-of-game fire is avoided at any tick'''
+        bits = self.future_fire_bits()
+        for cell in self.cells_from_bits(self.fire_bits):
+            if not cell.eog_fire:
+                bits |= cell.bit
+        return bits
+
+    def future_fire_bits(self):
+        '''Cells with future fire from either player'''
+        bits = 0
+        for player_bits in self.future_fire_start_bits:
+            bits |= player_bits
+        return bits
+
+    def escape_dists(self, player, invulnerable):
+        '''[pos]: fewest ticks to a cell without future fire for the player's unit at pos, like get_safe_paths'''
+        invulnerable = max(invulnerable, self.tick) # Arrivals are after tick, so is_safe can't tell these apart
+        key = (player.idx, invulnerable)
+        field = self._escape_dists_cache.get(key)
+        if field is not None:
+            return field
+
+        ff_bits = self.future_fire_bits()
+        ff_cells = self.cells_from_bits(ff_bits)
+        adjacent = self.topology.adjacent
+        last = SAFE_PATHS_LEN - 1
+        # escape[ready]: [pos] fewest ticks to escape from a future fire cell when able to move at tick + ready
+        escape = [[UNREACHABLE] * self.num_cells for _ in range(last + 1)]
+        for ready in range(last - 1, -1, -1):
+            arrival = ready + 1
+            for cell in ff_cells:
+                best = UNREACHABLE
+                for new_cell in adjacent[cell.pos]:
+                    if (not new_cell or new_cell.unit_next
+                        or (new_cell.unit and (new_cell.unit.hp <= 0 or not new_cell.unit.player is player))):
+                        continue # Same as search_neighbors
+                    # Waiting at cell isn't checked as in get_safe_paths, so no escape means no truly safe paths
+                    safe, safe_wait = new_cell.is_safe(player, self.tick + arrival, invulnerable)
+                    if not safe or arrival + safe_wait > last:
+                        continue
+                    if new_cell.bit & ff_bits:
+                        best = min(best, escape[arrival + safe_wait][new_cell.pos])
+                    else:
+                        best = min(best, arrival + safe_wait)
+                escape[ready][cell.pos] = best
+
+        field = [0] * self.num_cells
+        for cell in ff_cells:
+            field[cell.pos] = escape[0][cell.pos]
+        self._escape_dists_cache[key] = field
+        return field
+
+    def _clear_bits(self, bits):
+        clear = ~bits
+        self.wall_bits &= clear
+        self.box_bits &= clear
+        self.bomb_bits &= clear
+        self.fire_bits &= clear
+        self.powerup_bits &= clear
+        for player_idx in range(NUM_PLAYERS):
+            self.future_fire_start_bits[player_idx] &= clear
+
+    def bomb_cells(self):
+        if self.arrays is not None:
+            return [self.cells[pos] for pos in np.flatnonzero(self.arrays.bomb_diameter)]
+        return [cell for cell in self.cells if cell.bomb_diameter]
+
+    def save_bombs(self):
+        '''Snapshot bomb state so that actions simulated during a tick can be undone'''
+        self._saved_bombs = (
+            [list(player.bombs) for player in self.players.values()],
+            [list(unit.bombs) for unit in self.units.values()],
+            [(cell.bomb_diameter, cell.bomb_unit) for cell in self.cells],
+            self.bomb_bits)
+
+    def restore_bombs(self):
+        self._invalidate()
+        restored_bits = self.bomb_bits ^ self._saved_bombs[3]
+        self.changes.add(restored_bits, future_fire=bool(restored_bits))
+        self._drop_bomb_areas(restored_bits)
+        player_bombs, unit_bombs, cell_bombs, self.bomb_bits = self._saved_bombs
+        for player, bombs in zip(self.players.values(), player_bombs):
+            player.bombs = bombs
+        for unit, bombs in zip(self.units.values(), unit_bombs):
+            unit.bombs = bombs
+        for cell, (bomb_diameter, bomb_unit) in zip(self.cells, cell_bombs):
+            cell.bomb_diameter = bomb_diameter
+            cell.bomb_unit = bomb_unit
+
+    def _clear_future_fire(self):
+        if self.arrays is not None:
+            self.arrays.future_fire_start.fill(NONE)
+            self.arrays.future_fire_end.fill(NONE)
+        else:
+            for cell in self.cells_from_bits(self.future_fire_bits()): # Only cells with any are set
+                cell.future_fire_start[:] = NO_FUTURE_FIRE
+                cell.future_fire_end[:] = NO_FUTURE_FIRE
+        self.future_fire_start_bits = [0] * NUM_PLAYERS
 
     def init_eog_fire_neighbors(self):
-        cella = self.cell(0, SIZE - 1)
-        cellb = self.cell(SIZE - 1, 0)
+        '''Link up the two end-of-game fire spirals, from opposite corners until they meet or get stuck'''
+        cella = self.cell(0, self.height - 1)
+        cellb = self.cell(self.width - 1, 0)
+        self.eog_starts = (cella, cellb)
         dirs = ['east', 'west']
         next_dirs = {
             'east': 'south',
@@ -483,151 +1678,264 @@ class Board:
             'west': 'north',
             'north': 'east',
         }
-        while not cella is cellb:
+        spiral_cells = {cella, cellb}
+        turns = 0
+        while not cella is cellb and turns < len(next_dirs):
             nexta = getattr(cella, dirs[0])
             nextb = getattr(cellb, dirs[1])
-            if not nexta:
-                assert not nextb
-                dirs = [next_dirs[dirs[0]], next_dirs[dirs[1]]]
-                continue
-            if nexta.next_eog:
-                assert nextb.next_eog
+            if not nexta or nexta in spiral_cells:
+                assert not nextb or nextb in spiral_cells
                 dirs = [next_dirs[dirs[0]], next_dirs[dirs[1]]]
+                turns += 1
                 continue
             cella.next_eog = nexta
             cellb.next_eog = nextb
             cella = nexta
             cellb = nextb
+            spiral_cells.update((nexta, nextb))
+            turns = 0
+
+    def _init_eog_schedule(self, first_tick):
+        '''End-of-game fire spawns alternate between the spirals every fire_spawn_interval ticks'''
+        interval = self.fire_spawn_interval
+        self.eog_schedule = []
+        for spiral_idx, cell in enumerate(self.eog_starts):
+            spawn_ticks, cells = [], []
+            spawn_tick = first_tick + spiral_idx * interval
+            while cell:
+                spawn_ticks.append(spawn_tick)
+                cells.append(cell)
+                spawn_tick += NUM_PLAYERS * interval
+                cell = cell.next_eog
+            self.eog_schedule.append((spawn_ticks, cells))
 
     def get_bomb_area(self, cell, diameter=None):
-        bomb_cells = set()
-        blast_cells = set()
+        return self.cells_from_bits(self.get_bomb_area_bits(cell, diameter=diameter))
+
+    def get_bomb_area_bits(self, cell, diameter=None):
+        '''Bitboard of cells hit by the bomb at cell, including chained bombs, cached'''
+        key = (cell.pos, diameter)
+        blast_bits = self._bomb_areas.get(key)
+        if blast_bits is None:
+            blast_bits = self._bomb_areas[key] = self._search_bomb_area(cell, diameter)
+            for blast_cell in self.cells_from_bits(blast_bits):
+                self._bomb_area_keys[blast_cell.pos].add(key)
+        return blast_bits
+
+    def _drop_bomb_areas(self, bits=None):
+        '''Forget the cached bomb areas that reached the cells in bits (all if None)'''
+        if bits is None:
+            self._bomb_areas.clear()
+            self._bomb_area_keys = [set() for _ in range(self.num_cells)]
+            return
+        area_keys = self._bomb_area_keys
+        for cell in self.cells_from_bits(bits):
+            keys, area_keys[cell.pos] = area_keys[cell.pos], set()
+            for key in keys:
+                blast_bits = self._bomb_areas.pop(key, None)
+                if blast_bits is not None:
+                    for blast_cell in self.cells_from_bits(blast_bits):
+                        area_keys[blast_cell.pos].discard(key)
+
+    def _search_bomb_area(self, cell, diameter):
+        bomb_bits = 0
+        blast_bits = 0
         new_bomb_cells = [cell]
         while True:
             if not new_bomb_cells:
                 break
             bomb_cell = new_bomb_cells.pop()
-            if bomb_cell in bomb_cells:
+            if bomb_bits & bomb_cell.bit:
                 continue
-            bomb_cells.add(bomb_cell)
-            blast_cells.add(bomb_cell)
-            for direction in ('north', 'south', 'east', 'west'):
-                nearby_cell = bomb_cell
-                bomb_diameter = diameter if (not diameter is None and bomb_cell is cell) else bomb_cell.bomb_diameter
-                for _ in range(bomb_diameter // 2):
-                    nearby_cell = getattr(nearby_cell, direction)
-                    if not nearby_cell or nearby_cell.wall:
-                        break
-                    blast_cells.add(nearby_cell)
+            bomb_bits |= bomb_cell.bit
+            blast_bits |= bomb_cell.bit
+            bomb_diameter = diameter if (not diameter is None and bomb_cell is cell) else bomb_cell.bomb_diameter
+            for ray in self.topology.rays[bomb_cell.pos]:
+                for nearby_cell in ray[:bomb_diameter // 2]:
+                    blast_bits |= nearby_cell.bit
                     if nearby_cell.box or nearby_cell.blast_powerup or nearby_cell.freeze_powerup: # maybe powerups too?
                         # or nearby_cell.blast_powerup or nearby_cell.freeze_powerup:
                         break
                     if nearby_cell.bomb_diameter:
                         new_bomb_cells.append(nearby_cell)
-        return list(blast_cells)
-
-    def _update_dists(self):
+        return blast_bits
+
+    def _update_dists(self, changed_bits=None):
+        '''Recompute every unit's searches, or only repair them if just the cells in changed_bits changed'''
+        self._searched_tick = self.tick
+        self._searched_danger_bits = self.search_danger_bits()
+        if changed_bits is not None:
+            self.changes.add(changed_bits)
+            for unit in self.units.values():
+                unit._repair_dists(changed_bits)
+            return
         for cell in self.cells:
             cell.safe_paths = None
         for unit in self.units.values():
             unit._update_dists()
 
+    def _update_tick_state(self, full=False):
+        '''Bring future fire, danger, searches and target ranges up to date, skipping unaffected stages'''
+        changes, self.changes = self.changes, TickChanges()
+        for cell in self.cells: # Move reservations only last for the tick they were made in
+            if cell.unit_next:
+                changes.bits |= cell.bit
+                cell.unit_next = None
+
+        # Future fire tick values for bombs and end-of-game fire
+        if full or changes.future_fire or self._eog_latest() != self._future_fire_eog:
+            self._update_future_fire()
+            self._update_danger()
+        elif self.danger.tick != self.tick:
+            self.danger.advance(self.tick)
+
+        # Searches are tick-relative only where they meet danger, the others carry over
+        if full or self._searched_tick is None:
+            self._update_dists()
+        else:
+            self._update_dists_since(changes)
+        self._update_target_range() # need dists first
+
+    def _update_dists_since(self, changes):
+        '''Repair the searches that met no danger and whose unit didn't change, redo the others'''
+        danger_bits = self._searched_danger_bits | self.search_danger_bits()
+        danger_positions = [cell.pos for cell in self.cells_from_bits(danger_bits)]
+        for cell in self.cells_from_bits(changes.bits):
+            cell.safe_paths = None
+        for unit in self.units.values():
+            if (unit.hp <= 0 or unit.idx in changes.units or unit.cell.bit & changes.bits
+                or unit.cell.eog_fire # Its safe paths may cross end-of-game fire
+                or unit.stunned > self._searched_tick # Searched from a later start tick
+                or self.safe_dists[unit.idx].reaches(danger_positions)):
+                unit._update_dists()
+            elif changes.bits:
+                unit._repair_dists(changes.bits)
+        self._searched_tick = self.tick
+        self._searched_danger_bits = self.search_danger_bits()
+
+    def _tick_state(self):
+        '''Snapshot of what _update_tick_state derives, leaving out what depends on random tie-breaks'''
+        danger = self.danger
+        state = {
+            'future_fire': [(tuple(cell.future_fire_start), tuple(cell.future_fire_end)) for cell in self.cells],
+            'danger': [[list(row) for row in grid] for grid in (danger.ranges, danger.unsafe, danger.lethal, danger.next_safe)],
+            'searches': {},
+        }
+        danger_positions = [cell.pos for cell in self.cells_from_bits(self.search_danger_bits())]
+        for unit in self.units.values():
+            dists = self.safe_dists[unit.idx]
+            if unit.hp > 0 and not unit.cell.eog_fire and not dists.reaches(danger_positions):
+                state['searches'][unit.id] = ([dists[pos][0] for pos in range(self.num_cells)],
+                                              unit.cell.safe_paths and [set(cells) for cells in unit.cell.safe_paths])
+        if len(state['searches']) == len([unit for unit in self.units.values() if unit.hp > 0]):
+            state['target_range'] = [tuple(cell.target_range) for cell in self.cells]
+        return state
+
+    def _verify_tick_state(self):
+        '''Debug check against a full rebuild (which is kept), returns the names of what differed'''
+        state = self._tick_state()
+        self._update_tick_state(full=True)
+        full_state = self._tick_state()
+        state['hash'], full_state['hash'] = self.zobrist, self._compute_hash()
+        mismatches = sorted(name for name in state.keys() | full_state.keys() if state.get(name) != full_state.get(name))
+        for name in mismatches:
+            print(f'WARNING: tick {self.tick} {name} differs from a full rebuild')
+        return mismatches
+
     def _update_target_range(self):
         '''Positive if it favors player a, negative for player b'''
-        for cell in self.cells:
-            cell.target_range = [0] * len(cell.target_range)
-        for cell in self.cells:
-            if cell.wall or cell.box:
-                continue
-            for direction in ('north', 'south', 'east', 'west'):
-                nearby_cell = cell
-                for dist in range(len(cell.target_range)):
-                    nearby_cell = getattr(nearby_cell, direction)
-                    if not nearby_cell or nearby_cell.wall or nearby_cell.blast_powerup or nearby_cell.freeze_powerup:
-                        break
-                    if nearby_cell.box:
-                        min_dist = { 'a': UNREACHABLE, 'b': UNREACHABLE }
-                        for unit_id, unit in self.units.items():
-                            if unit.hp <= 0:
-                                continue
-                            if nearby_cell.safe_dists[unit_id][0] < min_dist[unit.player.id]: # todo safe dist to boxes?
-                                min_dist[unit.player.id] = nearby_cell.safe_dists[unit_id][0]
-                        multiplier = 0
-                        if min_dist['a'] < min_dist['b']:
-                            multiplier = 1
-                        elif min_dist['a'] > min_dist['b']:
-                            multiplier = -1
-                        for i in range(dist, len(cell.target_range)):
-                            cell.target_range[i] += multiplier / (10 ** (nearby_cell.hp - 1)) # 1, 0.1, 0.01
-                        break
-                    if (nearby_cell.unit
-                        and nearby_cell.unit.hp > 0 # not dead
-                        and nearby_cell.unit.stunned >= self.tick + 1 + 5): # still stunned when bomb can go off
-                        multiplier = 1 if (nearby_cell.unit.player.id == 'b') else -1
-                        for i in range(dist, len(cell.target_range)):
-                            cell.target_range[i] += multiplier * 20
-        #print(f'Target range values:')
-        #for y in range(SIZE - 1, -1, -1):
-        #    s = ''
-        #    for cell in self.cells[(y * SIZE):(y * SIZE + SIZE)]:
-        #        s += str((cell.target_range[0], cell.target_range[1])) + '\t'
-        #    print(s)
-
-    def _on_bomb_placed(self, cell, start=None, end=None, unit_id=None, bombs_processed=None, diameter=None):
-        '''Can be called more than once, and on different ticks'''
-        if unit_id is None:
-            unit_id = cell.bomb_unit.id
-        if start is None and end is None:
-            unit = cell.board.units[unit_id]
+        if self._target_ranges is None:
+            self._target_ranges = self.target_ranges_class(self)
+        self._target_ranges.update()
+
+    def _update_future_fire(self):
+        '''Future fire from every bomb and the coming end-of-game fire spawns, earliest start and end per cell'''
+        self._invalidate()
+        chains = self.get_bomb_chains()
+        fires = [[] for _ in range(NUM_PLAYERS)] # [player_idx]: [(start, end, bits)]
+        for pos, cluster_area in chains.cluster_area.items():
+            cell = self.cells[pos]
+            unit = cell.bomb_unit
             start, end = cell.created + 5, cell.expires + 5
             start = min(max(start, unit.stunned + 1), cell.expires)
             if unit.hp <= 0:
                 start = cell.expires
-        if bombs_processed is None:
-            bombs_processed = [cell]
-        if diameter is None:
-            radius = (cell.bomb_diameter // 2) + 1
-        else:
-            radius = (diameter // 2) + 1
-
-        def _set_future_fire(cell, count, direction, unit_id, bombs_processed):
-            if cell is None or count == 0 or cell.box or cell.wall:
-                return
-            if unit_id == 'i':
-                player_id = 'a'
-            elif unit_id == 'j':
-                player_id = 'b'
-            else:
-                player_id = cell.board.units[unit_id].player.id
-            if player_id in cell.future_fire_start: # Take the conservative start/end if overlapping
-                cell.future_fire_start[player_id] = min(cell.future_fire_start[player_id], start)
-                cell.future_fire_end[player_id] = min(cell.future_fire_end[player_id], end)
+            fires[unit.player.idx].append((start, end, cluster_area))
+        self._future_fire_eog = self._eog_latest()
+        for (spawn_ticks, cells), latest in zip(self.eog_schedule or (), self._future_fire_eog):
+            if latest < 0:
+                continue
+            for idx in range(latest + 1, len(cells)):
+                if spawn_ticks[idx] - spawn_ticks[latest] >= EOG_LOOKAHEAD:
+                    break
+                fire_bits, _ = chains.find_area(cells[idx], 1)
+                for player_fires in fires:
+                    player_fires.append((spawn_ticks[idx], 2000, fire_bits))
+
+        self._clear_future_fire()
+        for player_idx, player_fires in enumerate(fires):
+            start_ticks = self._earliest_ticks(player_fires, 0)
+            end_ticks = self._earliest_ticks(player_fires, 1)
+            if self.arrays is not None: # Straight into the arrays, skipping FutureFireView
+                starts = self.arrays._future_fire_start[player_idx]
+                ends = self.arrays._future_fire_end[player_idx]
+                for pos, start in start_ticks.items():
+                    starts[pos], ends[pos] = start, end_ticks[pos]
             else:
-                cell.future_fire_start[player_id], cell.future_fire_end[player_id] = start, end
-            _set_future_fire(getattr(cell, direction), count - 1, direction, unit_id, bombs_processed)
-
-            if cell.bomb_diameter and cell not in bombs_processed:
-                bombs_processed.append(cell)
-                self._on_bomb_placed(cell, start=start, end=end, unit_id=unit_id, bombs_processed=bombs_processed)
-
-        for direction in ('north', 'south', 'east', 'west'):
-            _set_future_fire(cell, radius, direction, unit_id, bombs_processed)
+                cells = self.cells
+                for pos, start in start_ticks.items():
+                    cells[pos].future_fire_start[player_idx] = start
+                    cells[pos].future_fire_end[player_idx] = end_ticks[pos]
+            for fire in player_fires:
+                self.future_fire_start_bits[player_idx] |= fire[2]
+
+    def _eog_latest(self):
+        '''Index of the latest end-of-game fire spawn so far in each spiral (-1 before its first)'''
+        return tuple(bisect.bisect_right(spawn_ticks, self.tick) - 1 for spawn_ticks, _ in self.eog_schedule or ())
+
+    def _earliest_ticks(self, fires, tick_idx):
+        '''{pos: earliest fire[tick_idx] among the (start, end, bits) fires reaching pos}'''
+        ticks = {}
+        done_bits = 0
+        for fire in sorted(fires, key=lambda fire: fire[tick_idx]):
+            for cell in self.cells_from_bits(fire[2] & ~done_bits):
+                ticks[cell.pos] = fire[tick_idx]
+            done_bits |= fire[2]
+        return ticks
 
     def _on_entity_spawned(self, payload):
+        self._invalidate()
         x, y = payload['x'], payload['y']
-        self.cells[y * SIZE + x]._on_entity_spawned(payload)
+        cell = self.cell(x, y)
+        self.changes.add(cell.bit, future_fire=payload['type'] not in ('bp', 'fp')) # Powerups don't stop blasts
+        cell._on_entity_spawned(payload)
 
     def _on_entity_expired(self, x, y):
-        self.cells[y * SIZE + x]._on_entity_expired()
+        self._invalidate()
+        cell = self.cell(x, y)
+        powerup_only = (cell.blast_powerup or cell.freeze_powerup) and not cell.has_future_fire()
+        self.changes.add(cell.bit, future_fire=not powerup_only)
+        cell._on_entity_expired()
 
     def _on_unit_state(self, payload):
-        unit_id = payload['unit_id']
-        self.units[unit_id]._on_unit_state(payload)
+        self._invalidate()
+        unit = self.units[payload['unit_id']]
+        self.changes.units.add(unit.idx)
+        self.changes.add(unit.cell.bit if unit.cell else 0, future_fire=bool(unit.bombs)) # Bombs wait out stuns
+        unit._on_unit_state(payload)
+        self.changes.add(unit.cell.bit)
 
 
 class GameState:
-    def __init__(self, connection_string: str):
+    def __init__(self, connection_string: str, backend: str = 'python', queue: str = 'bucket',
+                 target_ranges: str = 'incremental', verify: bool = False, seed: int = None):
         self._connection_string = connection_string
+        self._backend = backend
+        self._queue = queue
+        self._target_ranges = target_ranges
+        self._verify = verify # Check every tick's update against a full rebuild (slow, for debugging)
+        self.verify_mismatches = [] # (tick, name) of every mismatch found with verify
+        self._seed = seed # Board.seed, random if None
         self.board = None
         self._tick_callback = None
 
@@ -687,12 +1995,16 @@ class GameState:
 
     def _on_game_state(self, game_state):
         '''Recevie initial game state'''
-        self.board = Board(game_state)
+        self.board = Board(game_state, backend=self._backend, queue=self._queue,
+                           target_ranges=self._target_ranges, seed=self._seed)
         self.board._client = self
+        print(f'Board seed {self.board.seed}')
 
     async def _on_game_tick(self, game_tick):
         self.board.tick_start = time.time()
         self.board.tick = game_tick.get("tick")
+        self.board._invalidate()
+        self.board._draw_neighbor_orders()
         events = game_tick.get("events")
         for event in events:
             event_type = event.get("type")
@@ -716,48 +2028,10 @@ class GameState:
             else:
                 print(f"unknown event type {event_type}: {event}")
 
-        # Clear future fire tick values
-        for cell in self.board.cells:
-            cell.future_fire_start = {}
-            cell.future_fire_end = {}
-
-        # Update future fire tick values for bombs
-        for cell in self.board.cells:
-            if cell.bomb_diameter:
-                self.board._on_bomb_placed(cell)
-
-        # Update future fire tick values for end-of-game fire
-        for cell in self.board.cells:
-            if cell.eog_fire and cell.created >= self.board.tick - 3:
-                next_cell = cell.next_eog
-                add = 4
-                while next_cell and add < 35:
-                    self.board._on_bomb_placed(next_cell, start=cell.created + add, end=2000, unit_id='i', diameter=1)
-                    self.board._on_bomb_placed(next_cell, start=cell.created + add, end=2000, unit_id='j', diameter=1)
-                    add += 4
-                    next_cell = next_cell.next_eog
-                #if not cell.next_eog:
-                #    print(f'WARNING: no next eog at {cell.x},{cell.y}')
-                #else:
-                #    #print(f'eog (tick {self.board.tick})! latest={cell.x},{cell.y} (created={cell.created}); next={cell.next_eog.x},{cell.next_eog.y}')
-                #    self.board._on_bomb_placed(cell.next_eog, start=cell.created + 4, end=2000, unit_id='i', diameter=1)
-                #    self.board._on_bomb_placed(cell.next_eog, start=cell.created + 4, end=2000, unit_id='j', diameter=1)
-                #    #for pid in self.board.players:
-                #    #    cell.next_eog.future_fire_end[pid] = 2000
-                #    #    if pid in cell.next_eog.future_fire_start: # Take the conservative start if overlapping
-                #    #        cell.next_eog.future_fire_start[pid] = min(cell.next_eog.future_fire_start[pid], cell.created + 4)
-                #    #    else:
-                #    #        cell.next_eog.future_fire_start[pid] = cell.created + 4
-                #    if cell.next_eog.next_eog:
-                #        self.board._on_bomb_placed(cell.next_eog.next_eog, start=cell.created + 8, end=2000, unit_id='i', diameter=1)
-                #        self.board._on_bomb_placed(cell.next_eog.next_eog, start=cell.created + 8, end=2000, unit_id='j', diameter=1)
-                #        if cell.next_eog.next_eog.next_eog:
-                #            self.board._on_bomb_placed(cell.next_eog.next_eog.next_eog, start=cell.created + 12, end=2000, unit_id='i', diameter=1)
-                #            self.board._on_bomb_placed(cell.next_eog.next_eog.next_eog, start=cell.created + 12, end=2000, unit_id='j', diameter=1)
-                #            if cell.next_eog.next_eog.next_eog.next_eog:
-        # Update unit->cell distances
-        self.board._update_dists()
-        self.board._update_target_range() # need dists first
+        # Future fire, danger, unit->cell distances and target ranges, as far as the events changed them
+        self.board._update_tick_state()
+        if self._verify:
+            self.verify_mismatches += [(self.board.tick, name) for name in self.board._verify_tick_state()]
 
         if self._tick_callback is not None:
             #self.board.tick = game_tick.get("tick")
@@ -765,8 +2039,8 @@ class GameState:
 
         print(f'Tick {self.board.tick} handled in {round(1000 * (time.time() - self.board.tick_start))}ms')
         sa, sb = '', ''
-        for unit_id, unit in self.board.units.items():
-            if unit.player.id == 'a':
+        for unit in self.board.units.values():
+            if unit.player.idx == 0:
                 sa = sa + f'{unit.hp} '
             else:
                 sb = sb + f'{unit.hp} '
@@ -0,0 +1,237 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import time
+import unittest
+import unittest.mock
+
+from game_state import Board, GameState, SafeRegions, np
+
+
+REPLAY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'replay.json')
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'replay_baseline.json')
+
+
+class ReplayGameState(GameState):
+    '''GameState fed from a replay instead of a connection, actions are dropped'''
+    async def _send(self, packet):
+        pass
+
+
+def load_replay(num_ticks=None):
+    with open(REPLAY) as f:
+        payload = json.load(f)['payload']
+    initial_state = payload['initial_state']
+    initial_state.setdefault('connection', {'agent_id': 'a'})
+    return initial_state, payload['history'][:num_ticks]
+
+
+def replay(client, initial_state, history):
+    '''Yields client's board after each tick of history'''
+    with contextlib.redirect_stdout(io.StringIO()):
+        client._on_game_state(json.loads(json.dumps(initial_state)))
+    for game_tick in history:
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(client._on_game_tick(game_tick))
+        yield client.board
+
+
+def board_from_rows(rows):
+    '''Board from rows of text, top row first: # wall, o box, a-f units (c-h), . open'''
+    height, width = len(rows), len(rows[0])
+    entities, unit_state = [], {}
+    for row_idx, row in enumerate(rows):
+        y = height - 1 - row_idx
+        for x, char in enumerate(row):
+            if char == '#':
+                entities.append({'created': 0, 'x': x, 'y': y, 'type': 'm'})
+            elif char == 'o':
+                entities.append({'created': 0, 'x': x, 'y': y, 'type': 'w', 'hp': 1})
+            elif char in 'abcdef':
+                unit_id = 'cdefgh'['abcdef'.index(char)]
+                unit_state[unit_id] = {'coordinates': [x, y], 'hp': 3, 'blast_diameter': 3, 'unit_id': unit_id,
+                                       'agent_id': 'ab'[(unit_id in 'dfh')], 'invulnerable': 0, 'stunned': 0}
+    game_state = {
+        'world': {'width': width, 'height': height},
+        'config': {'fire_spawn_interval_ticks': 2},
+        'agents': {'a': {'unit_ids': ['c', 'e', 'g']}, 'b': {'unit_ids': ['d', 'f', 'h']}},
+        'unit_state': unit_state,
+        'entities': entities,
+        'connection': {'agent_id': 'a'},
+    }
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Board(game_state, seed=0)
+
+
+def flood(board, open_bits, start, blocked=None):
+    '''Positions reachable from start through open_bits, never entering blocked'''
+    reached = {start}
+    stack = [start]
+    while stack:
+        pos = stack.pop()
+        for new_pos in board.topology.neighbors[pos]:
+            if new_pos != blocked and open_bits >> new_pos & 1 and new_pos not in reached:
+                reached.add(new_pos)
+                stack.append(new_pos)
+    return reached
+
+
+def searches(board):
+    '''{unit_id: (safe dists, safe paths)} of the live units'''
+    return {unit.id: ([board.safe_dists[unit.idx][pos][0] for pos in range(len(board.cells))],
+                      unit.cell.safe_paths and [{cell.pos for cell in cells} for cells in unit.cell.safe_paths])
+            for unit in board.units.values() if unit.hp > 0}
+
+
+async def act(board):
+    import agent
+    for cell in board.cells:
+        cell.unit_next = None
+    board.start_time = time.time()
+    await agent.act(board, [u for u in board.player.units if u.hp > 0 and u.stunned < board.tick])
+
+
+def known(values, expected):
+    '''values where expected is known, the baseline has None where random tie-breaks changed it'''
+    return [value for value, expected_value in zip(values, expected) if expected_value is not None]
+
+
+class TestBoard(unittest.TestCase):
+    def test_replay_matches_baseline(self):
+        '''Safe dists, target ranges and future fire every 30 ticks, as the original board code had them'''
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+        initial_state, history = load_replay()
+        checked = 0
+        for board in replay(GameState('', seed=0), initial_state, history):
+            expected = baseline.get(str(board.tick))
+            if expected is None:
+                continue
+            checked += 1
+            for unit_id, dists in expected['safe_dists'].items():
+                unit_dists = board.safe_dists[board.units[unit_id].idx]
+                actual = [unit_dists[pos][0] for pos in range(len(board.cells))]
+                self.assertEqual(known(actual, dists), known(dists, dists), (board.tick, unit_id))
+            for cell in board.cells:
+                target_range = expected['target_range'].get(str(cell.pos), [0] * len(cell.target_range))
+                if target_range is not None:
+                    self.assertEqual(list(cell.target_range), target_range, (board.tick, cell.pos))
+                future_fire = expected['future_fire'].get(str(cell.pos), [[None, None]] * 2)
+                actual = [[cell.future_fire_start[player_idx], cell.future_fire_end[player_idx]] for player_idx in range(2)]
+                self.assertEqual(known(actual, future_fire), known(future_fire, future_fire), (board.tick, cell.pos))
+        self.assertEqual(checked, len(baseline))
+
+    def test_queues_match(self):
+        initial_state, history = load_replay()
+        runs = []
+        for queue in ('bucket', 'heap'): # Same seed, same neighbor orders
+            runs.append([[[board.safe_dists[unit.idx][pos][0] for pos in range(len(board.cells))] for unit in board.units.values()]
+                         for board in replay(GameState('', queue=queue, seed=0), initial_state, history)])
+        self.assertEqual(runs[0], runs[1])
+
+    @unittest.skipIf(np is None, 'numpy is not installed')
+    def test_numpy_target_ranges_match_incremental(self):
+        initial_state, history = load_replay()
+        runs = []
+        for client in (GameState('', seed=0), GameState('', backend='numpy', target_ranges='numpy', seed=0)):
+            runs.append([[list(cell.target_range) for cell in board.cells]
+                         for board in replay(client, initial_state, history)])
+        self.assertIsNotNone(client.board.arrays)
+        self.assertEqual(runs[0], runs[1])
+
+    def test_in_tick_repairs_match_full_rebuild(self):
+        initial_state, history = load_replay()
+        client = ReplayGameState('', seed=0)
+        client.set_game_tick_callback(act)
+        repairs, mismatches = [], []
+        update_dists = Board._update_dists
+        def checked_update_dists(board, changed_bits=None):
+            update_dists(board, changed_bits)
+            if changed_bits is not None: # An agent action
+                repaired = searches(board)
+                update_dists(board) # The next action repairs this rebuild
+                rebuilt = searches(board)
+                repairs.append(board.tick)
+                mismatches.extend((board.tick, unit_id) for unit_id in rebuilt if rebuilt[unit_id] != repaired[unit_id])
+        with unittest.mock.patch.object(Board, '_update_dists', checked_update_dists):
+            for _ in replay(client, initial_state, history):
+                pass
+        self.assertGreater(len(repairs), 100)
+        self.assertEqual(mismatches, [])
+
+    def test_tick_state_matches_full_rebuild(self):
+        initial_state, history = load_replay()
+        for with_agent in (False, True):
+            client = ReplayGameState('', seed=0, verify=True)
+            if with_agent: # In-tick actions patch the state between ticks
+                client.set_game_tick_callback(act)
+            for _ in replay(client, initial_state, history):
+                pass
+            self.assertEqual(client.verify_mismatches, [])
+
+    def test_hash_matches_recompute(self):
+        initial_state, history = load_replay()
+        client = ReplayGameState('', seed=0)
+        client.set_game_tick_callback(act)
+        for board in replay(client, initial_state, history):
+            self.assertEqual(board.hash(), board._compute_hash())
+
+    def test_cut_cells_match_flood(self):
+        board = board_from_rows([
+            'a..#..o..',
+            '.#.#.##.b',
+            '...o.....',
+            '##.#.#.#.',
+            'c.....#.d',
+            '.#o#.....',
+            'e..#.#f#.',
+        ])
+        cut_index = board.get_cut_index()
+        open_bits = cut_index.open_bits
+        open_positions = [cell.pos for cell in board.cells_from_bits(open_bits)]
+        articulation_bits = 0
+        for pos in open_positions:
+            region = flood(board, open_bits, pos)
+            others = [other for other in region if other != pos]
+            if others and len(flood(board, open_bits, others[0], blocked=pos)) < len(others):
+                articulation_bits |= 1 << pos
+        self.assertEqual(cut_index.articulation_bits, articulation_bits)
+        self.assertNotEqual(articulation_bits, 0)
+
+        for bits in (open_bits, sum(1 << pos for pos in open_positions[::3])):
+            for start in open_positions:
+                region = flood(board, open_bits, start)
+                expected = {}
+                for pos in region - {start}:
+                    reached = flood(board, open_bits, start, blocked=pos)
+                    count = sum(1 for other in region - reached - {pos} if bits >> other & 1)
+                    if count:
+                        expected[pos] = count
+                cut_cells = cut_index.cut_cells(board.cells[start], bits)
+                self.assertEqual({cell.pos: count for cell, count in cut_cells}, expected)
+                self.assertEqual([count for _, count in cut_cells], sorted(expected.values(), reverse=True))
+
+        for block in cut_index.blocks: # Every edge between open cells is in exactly one block
+            self.assertEqual(block & ~open_bits, 0)
+        for pos in open_positions:
+            for new_pos in board.topology.neighbors[pos]:
+                if open_bits >> new_pos & 1:
+                    self.assertEqual(sum(1 for block in cut_index.blocks if block >> pos & 1 and block >> new_pos & 1), 1)
+
+
+    def test_safe_regions_match_rebuild(self):
+        initial_state, history = load_replay()
+        client = ReplayGameState('', seed=0)
+        client.set_game_tick_callback(act)
+        for board in replay(client, initial_state, history):
+            safe_regions, rebuilt = board.get_safe_regions(), SafeRegions(board)
+            self.assertEqual({bits: safe_regions.truly_safe[region_id] for region_id, bits in safe_regions.region_bits.items()},
+                             {bits: rebuilt.truly_safe[region_id] for region_id, bits in rebuilt.region_bits.items()})
+            for cell in board.cells:
+                self.assertEqual(safe_regions.bits(cell), rebuilt.bits(cell))
+
+
+if __name__ == '__main__':
+    unittest.main()